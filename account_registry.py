@@ -0,0 +1,58 @@
+"""
+The accounts, loaded once and kept in memory with maps between IDs and the labels
+shown in the comboboxes. The registry reloads on the next lookup after an
+ACCOUNT_CHANGED event.
+"""
+from collections import Counter
+from event_bus import ACCOUNT_CHANGED
+
+def account_label(name, account_number):
+    return f"{name} ({account_number})"
+
+class AccountRegistry:
+    def __init__(self, db):
+        self.db = db
+        self.accounts = None  # account_id -> (id, name, account_number, notes), in database order; None until loaded
+        self.labels = {}  # account_id -> label
+        self.by_name = {}  # (name, account_number) -> account_id
+        db.events.subscribe(ACCOUNT_CHANGED, self.on_accounts_changed)
+
+    def on_accounts_changed(self, event, transaction_ids, account_ids):
+        self.accounts = None
+
+    def load(self):
+        if self.accounts is None:
+            accounts = self.db.fetch_all_accounts()
+            self.accounts = {account[0]: account for account in accounts}
+            self.labels = {account[0]: account_label(account[1], account[2]) for account in accounts}
+            # Combobox.current() looks the selection up by its text, so two accounts must never share a label
+            counts = Counter(self.labels.values())
+            for account_id, label in self.labels.items():
+                if counts[label] > 1:
+                    self.labels[account_id] = f"{label} #{account_id}"
+            self.by_name = {}
+            for account in accounts:
+                self.by_name.setdefault((account[1], account[2]), account[0])  # The first one wins, like the old linear scan
+        return self.accounts
+
+    def ids(self):
+        """Return the account IDs in database order, matching label_list()."""
+        return list(self.load())
+
+    def label_list(self):
+        """Return the combobox labels in database order, matching ids()."""
+        self.load()
+        return list(self.labels.values())
+
+    def get(self, account_id):
+        """Return the account as (id, name, account_number, notes), or None."""
+        return self.load().get(account_id)
+
+    def label(self, account_id):
+        self.load()
+        return self.labels.get(account_id, "")
+
+    def find(self, name, account_number):
+        """Return the ID of the account with this name and number, or None."""
+        self.load()
+        return self.by_name.get((name, account_number))
@@ -0,0 +1,125 @@
+"""
+A bar chart embedded in a Tk widget, built once and updated in place.
+
+The figure is made with matplotlib.figure.Figure rather than pyplot, so no global
+figure manager holds on to it; it goes away with its widget. Updating with the same
+number of bars only changes the bar heights and tick labels and schedules a redraw
+with draw_idle, so repeated updates neither rebuild the axes nor allocate new artists.
+Several series can be drawn grouped or stacked. Long series are merged into at most
+`max_bars` bars.
+"""
+MAX_BARS = 60
+
+def downsample(labels, values, max_bars=MAX_BARS):
+    """
+    Merge neighbouring bars so there are at most `max_bars`. Each merged bar is the sum of
+    its group and is labelled "first–last".
+
+    :return: A tuple (labels, values) of lists.
+    """
+    labels, values = list(labels), list(values)
+    if len(values) <= max_bars:
+        return labels, values
+    size = -(-len(values) // max_bars)  # Bars per group, rounded up
+    merged_labels = []
+    merged_values = []
+    for start in range(0, len(values), size):
+        group = labels[start:start + size]
+        merged_labels.append(group[0] if len(group) == 1 else f"{group[0]}–{group[-1]}")
+        merged_values.append(sum(values[start:start + size]))
+    return merged_labels, merged_values
+
+class BarChart:
+    def __init__(self, master, title="", xlabel="", ylabel="", color=None, dpi=100, fontsize=None, tooltips=False, max_bars=MAX_BARS):
+        """
+        :param master: The Tk widget to put the chart in; pack or grid `self.widget` yourself.
+        :param tooltips: Show the amount when hovering over a bar (needs mplcursors).
+        """
+        # Matplotlib takes longer to import than the rest of the app, so wait until a chart is made
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.figure = Figure(dpi=dpi, tight_layout=True)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title(title, fontsize=fontsize and fontsize + 2)
+        self.ax.set_xlabel(xlabel, fontsize=fontsize)
+        self.ax.set_ylabel(ylabel, fontsize=fontsize)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.color = color
+        self.fontsize = fontsize
+        self.tooltips = tooltips
+        self.max_bars = max_bars
+        self.bars = []  # One BarContainer per series
+        self.layout = None  # (number of bars, series names, stacked) the bars were built for
+        self.cursor = None
+
+    def update(self, labels, values, title=None):
+        """Show `values` as bars labelled with `labels`, reusing the existing bars when the count is unchanged."""
+        self.update_series(labels, {"": values}, title)
+
+    def update_series(self, labels, series, title=None, stacked=False):
+        """
+        Show several series side by side (or stacked) over the same labels.
+
+        :param series: {name: values}, each with one value per label. The names are shown in a legend.
+        :param stacked: Stack the series instead of grouping them; negative values stack downwards.
+        """
+        names = list(series)
+        merged_labels = list(labels)
+        merged = {}
+        for name in names:
+            merged_labels, merged[name] = downsample(labels, series[name], self.max_bars)
+        count = len(merged_labels)
+        layout = (count, names, stacked)
+
+        # Stacked bars start where the previous series ended, on the same side of zero
+        positive_bottoms = [0.0] * count
+        negative_bottoms = [0.0] * count
+        bottoms = {}
+        for name in names:
+            bottoms[name] = [positive_bottoms[i] if value >= 0 else negative_bottoms[i] for i, value in enumerate(merged[name])] if stacked else [0.0] * count
+            if stacked:
+                for i, value in enumerate(merged[name]):
+                    if value >= 0:
+                        positive_bottoms[i] += value
+                    else:
+                        negative_bottoms[i] += value
+
+        if layout == self.layout:
+            for container, name in zip(self.bars, names):
+                for bar, value, bottom in zip(container, merged[name], bottoms[name]):
+                    bar.set_y(bottom)
+                    bar.set_height(value)
+        else:
+            for container in self.bars:
+                container.remove()
+            width = 0.8 if stacked else 0.8 / max(len(names), 1)
+            self.bars = []
+            for index, name in enumerate(names):
+                offset = 0 if stacked else (index - (len(names) - 1) / 2) * width
+                self.bars.append(self.ax.bar([i + offset for i in range(count)], merged[name], width, bottom=bottoms[name],
+                                             color=self.color if len(names) == 1 else None, label=name))
+            self.ax.set_xlim(-0.6, max(count, 1) - 0.4)
+            self.ax.set_xticks(range(count))
+            if self.ax.get_legend() is not None:
+                self.ax.get_legend().remove()
+            if len(names) > 1:
+                self.ax.legend(fontsize=self.fontsize)
+            self.layout = layout
+            self.connect_tooltips()
+        self.ax.set_xticklabels(merged_labels, rotation=45, ha='right', fontsize=self.fontsize)
+        if title is not None:
+            self.ax.set_title(title, fontsize=self.fontsize and self.fontsize + 2)
+        # Rescale the y axis to the new heights only
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        self.canvas.draw_idle()
+
+    def connect_tooltips(self):
+        if not self.tooltips:
+            return
+        import mplcursors
+        if self.cursor is not None:
+            self.cursor.remove()
+        self.cursor = mplcursors.cursor(self.bars, hover=True)
+        self.cursor.connect("add", lambda sel: sel.annotation.set_text(f'Beløp: {sel.artist[sel.index].get_height():.2f}' if hasattr(sel.artist, "patches") else f'Beløp: {sel.target[1]:.2f}'))
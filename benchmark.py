@@ -0,0 +1,201 @@
+"""
+Time common actions in the app against synthetic databases of several sizes, and
+compare the results with a stored baseline.
+
+The GUI is driven through its methods with the main window withdrawn, so no clicks
+are needed, but Tk still needs a display. On a server, run it under Xvfb:
+
+    xvfb-run python benchmark.py --sizes 1000,10000,100000 --save-baseline
+    xvfb-run python benchmark.py                  # fails if an action got slower than the baseline
+    xvfb-run python benchmark.py --module gui_new # includes the trend chart
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "benchmark_baseline.json")
+DEFAULT_SIZES = (1000, 10000, 100000)
+# The seeded data ends here, whatever the date; the tabs are set to its last year instead of the current one
+PERIOD_END = date(2024, 12, 31)
+PERIOD_START = date(PERIOD_END.year, 1, 1)
+
+class Timer:
+    def __init__(self, root, repeat):
+        self.root = root
+        self.repeat = repeat
+        self.results = {}
+
+    def time(self, name, action, repeat=None):
+        """Run `action` and let Tk finish drawing; store the median wall-clock time in seconds."""
+        durations = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            action()
+            self.root.update_idletasks()
+            durations.append(time.perf_counter() - start)
+        self.results[name] = statistics.median(durations)
+        print(f"  {name:<24} {self.results[name] * 1000:9.1f} ms", flush=True)
+
+def run_actions(module_name, repeat):
+    """Drive the app against transactions.db in the current directory and time each action."""
+    import tkinter as tk
+    from tkinter import messagebox
+    module = __import__(module_name)
+    from budget_tab import BudgetTab
+
+    # Dialogs would block the run, so they just do nothing
+    messagebox.showinfo = messagebox.showwarning = lambda *args, **kwargs: None
+
+    root = tk.Tk()
+    root.withdraw()
+    timer = Timer(root, repeat)
+    app = None
+
+    def open_app():
+        nonlocal app
+        app = module.TransactionApp(root)
+        root.unbind("<Map>")  # The window is withdrawn and never maps, so load directly
+        app.from_entry.set_date(PERIOD_START)
+        app.to_entry.set_date(PERIOD_END)
+        app.load_data()
+
+    timer.time("open app", open_app, repeat=1)
+
+    def switch_account(index):
+        app.account_var.set(app.account_menu['values'][index])
+        app.handler.on_account_select(None)
+
+    timer.time("switch account", lambda: (switch_account(1), switch_account(0)))
+
+    def search(text):
+        app.search_var.set(text)
+        app.handler.filter_transactions()
+
+    timer.time("filter", lambda: search("rema"))
+    timer.time("clear filter", app.handler.clear_search_filter)
+    timer.time("sort by amount", lambda: app.handler.sort_treeview("Beløp", False))
+    timer.time("sort by date", lambda: app.handler.sort_treeview("Dato", True))
+    timer.time("next page", lambda: (app.handler.next_page(), app.handler.prev_page()))
+
+    budget_frame = tk.Frame(root)
+    budget = None
+
+    def open_budget():
+        nonlocal budget
+        budget = BudgetTab(budget_frame, app.db)
+
+    timer.time("open budget tab", open_budget, repeat=1)
+    budget.budget_from_entry.set_date(PERIOD_START)
+    budget.budget_to_entry.set_date(PERIOD_END)
+    timer.time("generate budget", budget.generate_budget)
+
+    if hasattr(app, "show_trend"):
+        timer.time("show trend", app.show_trend)  # The trend window stays open and is updated in place
+
+    from reporting_tab import ReportingTab
+    reporting_frame = tk.Frame(root)
+    reporting = None
+
+    def open_reporting():
+        nonlocal reporting
+        reporting = ReportingTab(reporting_frame, app.db)
+
+    timer.time("open reporting tab", open_reporting, repeat=1)
+    reporting.from_entry.set_date(PERIOD_START)
+    reporting.to_entry.set_date(PERIOD_END)
+    reporting.search_var.set("rema")
+    timer.time("generate report", reporting.generate_report)
+
+    if app.handler.categorization_worker is not None:
+        app.handler.categorization_worker.stop()
+    root.destroy()
+    return timer.results
+
+def run(module_name, sizes, repeat):
+    from database import Database
+    from synthetic_data import seed_database
+    results = {}
+    cwd = os.getcwd()
+    for size in sizes:
+        print(f"{size} transactions", flush=True)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # The app opens transactions.db in the working directory
+            os.chdir(temp_dir)
+            try:
+                db = Database("transactions.db")
+                seed_database(db, size, accounts=2, with_categories=True, end=PERIOD_END)
+                db.conn.close()
+                results[str(size)] = run_actions(module_name, repeat)
+            finally:
+                os.chdir(cwd)
+    return results
+
+def compare(results, baseline, tolerance, min_delta):
+    """
+    Return the actions that got slower than the baseline.
+
+    :param tolerance: Allowed slowdown as a fraction, e.g. 0.25 for 25%.
+    :param min_delta: Slowdowns smaller than this many seconds are ignored as noise.
+    :return: A list of (size, action, baseline_seconds, seconds).
+    """
+    regressions = []
+    for size, actions in results.items():
+        for action, seconds in actions.items():
+            expected = baseline.get(size, {}).get(action)
+            if expected is not None and seconds > expected * (1 + tolerance) and seconds - expected > min_delta:
+                regressions.append((size, action, expected, seconds))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app actions on synthetic data.")
+    parser.add_argument("--module", default="gui", help="gui or gui_new")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated numbers of transactions")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per action; the median is used")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns below this many seconds")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.DEBUG)  # The database logs every query
+    sys.path.insert(0, HERE)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(args.module, sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[args.module] = results
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if args.module not in baselines:
+        print("No baseline to compare with; run with --save-baseline first")
+        return
+
+    regressions = compare(results, baselines[args.module], args.tolerance, args.min_delta)
+    for size, action, expected, seconds in regressions:
+        print(f"Slower: {action} with {size} transactions: {seconds * 1000:.1f} ms (baseline {expected * 1000:.1f} ms)")
+    if regressions:
+        sys.exit(1)
+    print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,17 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from tkcalendar import DateEntry
 from datetime import datetime
+import reports
+from event_bus import IdleCoalescer, ACCOUNT_CHANGED, TRANSACTION_EVENTS
 
 class BudgetTab:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
         self.current_account_id = None
+        self.account_ids = []  # Account IDs in the order of the account combobox
         self.budgets = {}
+        self.generated_period = None  # (from_date, to_date) while the tree shows an unedited generated budget
 
         # Account selection
         self.budget_account_var = tk.StringVar()
@@ -95,20 +99,31 @@ class BudgetTab:
         self.status_label = tk.Label(status_frame, text="Status: ", anchor='w')
         self.status_label.pack(fill='x', padx=2, pady=1)
 
-        # Load accounts and budgets
+        # Load accounts and budgets, and again when accounts or transactions change
         self.load_accounts()
+        self.db.events.subscribe((ACCOUNT_CHANGED,) + TRANSACTION_EVENTS, IdleCoalescer(self.parent, self.on_data_changed))
 
     def load_accounts(self):
-        accounts = self.db.fetch_all_accounts()
-        account_names = [f"{name} ({account_number})" for id, name, account_number, notes in accounts]
-        self.budget_account_menu['values'] = account_names
-        if accounts:
-            self.budget_account_var.set(account_names[0])
-            self.current_account_id = accounts[0][0]
-            self.load_budgets()
-        else:
-            self.budget_account_var.set("")
-            self.current_account_id = None
+        registry = self.db.account_registry
+        self.account_ids = registry.ids()  # Parallel to the combobox labels; the selected index gives the ID
+        self.budget_account_menu['values'] = registry.label_list()
+        if self.current_account_id not in self.account_ids:
+            self.current_account_id = self.account_ids[0] if self.account_ids else None
+            if self.current_account_id is not None:
+                self.load_budgets()
+        self.budget_account_var.set(registry.label(self.current_account_id))
+
+    def on_data_changed(self, changes):
+        """Update after a burst of database events; `changes` is {event: (transaction IDs, account IDs)}."""
+        if ACCOUNT_CHANGED in changes:
+            self.load_accounts()
+        # A generated budget is recalculated when transactions in its account change; saved or edited ones are left alone
+        changed_accounts = set()
+        for event in TRANSACTION_EVENTS:
+            if event in changes:
+                changed_accounts |= changes[event][1]
+        if self.generated_period and changed_accounts and (self.current_account_id is None or self.current_account_id in changed_accounts):
+            self.show_generated_budget(*self.generated_period)
 
     def load_budgets(self):
         budgets = self.db.fetch_budgets(self.current_account_id)
@@ -119,16 +134,10 @@ class BudgetTab:
             self.load_budget(list(self.budgets.keys())[0])
 
     def on_budget_account_select(self, event):
-        selected_account = self.budget_account_var.get()
-        if selected_account:
-            account_name, account_number = selected_account.split(" (")
-            account_number = account_number.rstrip(")")
-            accounts = self.db.fetch_all_accounts()
-            for account in accounts:
-                if account[1] == account_name and account[2] == account_number:
-                    self.current_account_id = account[0]
-                    self.load_budgets()
-                    break
+        index = self.budget_account_menu.current()
+        if index >= 0:
+            self.current_account_id = self.account_ids[index]
+            self.load_budgets()
 
     def on_budget_name_select(self, event):
         selected_budget = self.budget_name_var.get()
@@ -146,6 +155,7 @@ class BudgetTab:
             self.update_status_label()
 
     def load_budget(self, budget_name):
+        self.generated_period = None
         for row in self.budget_tree.get_children():
             self.budget_tree.delete(row)
         for category, income_amount, expense_amount in self.budgets[budget_name]:
@@ -158,32 +168,13 @@ class BudgetTab:
         if not from_date or not to_date:
             messagebox.showwarning("Advarsel", "Velg en gyldig dato-periode.")
             return
+        self.show_generated_budget(from_date, to_date)
 
-        transactions = self.db.fetch_all_transactions(self.current_account_id)
-        transactions = [t for t in transactions if from_date <= datetime.strptime(t[1], "%d.%m.%Y").date() <= to_date]
-
-        # Calculate income and expenses per category
-        income_summary = {}
-        expense_summary = {}
-        total_income = 0
-        total_expenses = 0
-        for transaction in transactions:
-            try:
-                amount = float(transaction[3])
-            except ValueError:
-                amount = 0  # Fallback if conversion fails
-            if transaction[4] == "Inntekt":
-                if transaction[5] in income_summary:
-                    income_summary[transaction[5]] += amount
-                else:
-                    income_summary[transaction[5]] = amount
-                total_income += amount
-            elif transaction[4] == "Utgift":
-                if transaction[5] in expense_summary:
-                    expense_summary[transaction[5]] += amount
-                else:
-                    expense_summary[transaction[5]] = amount
-                total_expenses += amount
+    def show_generated_budget(self, from_date, to_date):
+        # Income and expenses per category
+        budget = reports.budget(self.db, self.current_account_id, from_date, to_date)
+        income_summary = budget["income"]
+        expense_summary = budget["expenses"]
 
         # Clear the treeview
         for row in self.budget_tree.get_children():
@@ -198,6 +189,7 @@ class BudgetTab:
 
         self.update_total_row()
         self.update_status_label()
+        self.generated_period = (from_date, to_date)
 
     def save_budget(self):
         budget_name = self.budget_name_var.get()
@@ -224,6 +216,7 @@ class BudgetTab:
         amount = simpledialog.askfloat("Rediger Budsjettlinje", f"Nytt beløp for {category}:", initialvalue=float(values[1]) if values[1] else 0.0)
 
         if amount is not None:
+            self.generated_period = None
             if amount < 0:
                 self.budget_tree.item(selected_item, values=(category, "", f"{abs(amount):.2f}"))
             else:
@@ -237,6 +230,7 @@ class BudgetTab:
         amount = simpledialog.askfloat("Legg til Budsjettlinje", f"Beløp for {category}:")
 
         if category and amount is not None:
+            self.generated_period = None
             if amount < 0:
                 self.budget_tree.insert("", "end", values=(category, "", f"{abs(amount):.2f}"))
             else:
@@ -248,6 +242,7 @@ class BudgetTab:
     def delete_budget_line(self):
         selected_item = self.budget_tree.selection()
         if selected_item:
+            self.generated_period = None
             self.budget_tree.delete(selected_item)
             self.update_total_row()
             self.update_status_label()
@@ -1,29 +1,382 @@
 import os
-from mistralai import Mistral
+import json
+import logging
+import math
+import queue
+import re
+import threading
 import time
+from types import SimpleNamespace
+from database import Database, Transaction
+from metrics import metrics
 
-def categorize_transactions(db, transactions_to_categorize):
-    api_key = os.environ["mistralkey"]
-    client = Mistral(api_key=api_key)
-
-    for transaction_id in transactions_to_categorize:
-        transaction_id = transaction_id[0]  # Extract the transaction ID from the tuple
-        transaction = db.fetch_transaction_by_id(transaction_id)
-        if not transaction[5]:  # Check if Kategori is empty
-            chat_response = client.agents.complete(
-                agent_id="ag:c1167df1:20250306:untitled-agent:c5ef5a85", #Lag din egen agent her! 
-                messages=[
-                    {
-                        "role": "user",
-                        "content": str(transaction[3]) + " " + transaction[2],  # Beløp and Beskrivelse
-                    },
-                ],
-            )
-            category = chat_response.choices[0].message.content
-            if transaction[4] == "Inntekt" and category not in ["Lønn", "Annen inntekt"]:
-                category = "Annen inntekt"
-                print("Corrected income category from bad agent output")
-
-            db.update_category(transaction_id, category)  # Update the category in the database
-            print(f"Categorized transaction ID {transaction_id} as {category}")
-            time.sleep(5)  # Pause to avoid overwhelming the API
+AGENT_ID = "ag:c1167df1:20250306:untitled-agent:c5ef5a85"  # Lag din egen agent her!
+MAX_ATTEMPTS = 3  # Attempts per transaction before the job is marked as failed
+
+# Backends tried in order, cheapest first. Override with PENGESJEKK_BACKENDS, e.g. "rules,cache,http".
+DEFAULT_BACKENDS = "rules,cache,local,agent"
+REMOTE_BACKENDS = ("agent", "http")  # Backends whose answers come from a language model
+
+class CategorizerUnavailable(Exception):
+    """Raised when a backend can't be used, e.g. because the API key is missing."""
+
+def normalize_description(description):
+    # Drop digits (dates, KID and card numbers) so recurring payments share a key
+    return " ".join(re.sub(r"\d+", " ", description.lower()).split())
+
+class Backend:
+    """
+    A source of categories. `categorize` returns a category, or None if the
+    backend has no answer for the transaction.
+    """
+    name = "backend"
+    delay = 0  # Seconds to pause after each call, for rate-limited services
+
+    def categorize(self, transaction):
+        return None
+
+    def remember(self, transaction, category):
+        """Called with answers from other backends in a cascade."""
+
+class RulesBackend(Backend):
+    """Keyword rules matched against the description, e.g. [("rema 1000", "Dagligvarer")]."""
+    name = "rules"
+
+    def __init__(self, rules=None):
+        self.rules = [(keyword.lower(), category) for keyword, category in (rules or [])]
+
+    def categorize(self, transaction):
+        description = transaction.description.lower()
+        for keyword, category in self.rules:
+            if keyword in description:
+                return category
+        return None
+
+class CacheBackend(Backend):
+    """Reuses the category of an earlier transaction with the same normalized description."""
+    name = "cache"
+
+    def __init__(self, examples=()):
+        self.categories = {normalize_description(description): category for description, category in examples}
+
+    def categorize(self, transaction):
+        return self.categories.get(normalize_description(transaction.description))
+
+    def remember(self, transaction, category):
+        self.categories[normalize_description(transaction.description)] = category
+
+class LocalModelBackend(Backend):
+    """
+    A naive Bayes classifier over description words, trained on already categorized
+    transactions. Only answers when the best category is at least `threshold` likely.
+    """
+    name = "local"
+
+    def __init__(self, examples=(), threshold=0.9, min_examples=50):
+        self.threshold = threshold
+        self.category_counts = {}
+        self.word_counts = {}  # category -> {word: count}
+        self.word_totals = {}
+        self.vocabulary = set()
+        for description, category in examples:
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+            counts = self.word_counts.setdefault(category, {})
+            for word in normalize_description(description).split():
+                counts[word] = counts.get(word, 0) + 1
+                self.word_totals[category] = self.word_totals.get(category, 0) + 1
+                self.vocabulary.add(word)
+        self.example_count = sum(self.category_counts.values())
+        self.enabled = self.example_count >= min_examples
+
+    def categorize(self, transaction):
+        words = normalize_description(transaction.description).split()
+        if not self.enabled or not words:
+            return None
+        scores = {}
+        for category, count in self.category_counts.items():
+            counts = self.word_counts[category]
+            denominator = self.word_totals.get(category, 0) + len(self.vocabulary)
+            scores[category] = math.log(count / self.example_count) + sum(math.log((counts.get(word, 0) + 1) / denominator) for word in words)
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best if 1 / total >= self.threshold else None
+
+class MistralAgentBackend(Backend):
+    """The agent on Mistral's La Plateforme. Needs the API key in the `mistralkey` environment variable."""
+    name = "agent"
+    delay = 5  # Pause to avoid overwhelming the API
+
+    def __init__(self, api_key=None, agent_id=AGENT_ID):
+        api_key = api_key or os.environ.get("mistralkey")
+        if not api_key:
+            raise CategorizerUnavailable("Mangler API-nøkkel i miljøvariabelen mistralkey.")
+        from mistralai import Mistral
+        self.client = Mistral(api_key=api_key)
+        self.agent_id = agent_id
+        self.last_usage = None
+
+    def categorize(self, transaction):
+        chat_response = self.client.agents.complete(
+            agent_id=self.agent_id,
+            messages=[
+                {
+                    "role": "user",
+                    "content": str(transaction.amount) + " " + transaction.description,  # Beløp and Beskrivelse
+                },
+            ],
+        )
+        self.last_usage = getattr(chat_response, "usage", None)
+        return chat_response.choices[0].message.content
+
+class HttpBackend(Backend):
+    """
+    A categorization service speaking a small JSON protocol: POST {"description", "amount", "direction"}
+    and get back {"category", "usage"}. Used with fake_categorizer_server.py for offline load tests.
+    """
+    name = "http"
+
+    def __init__(self, url, timeout=30, delay=0):
+        self.url = url
+        self.timeout = timeout
+        self.delay = delay
+        self.last_usage = None
+
+    def categorize(self, transaction):
+        import urllib.request  # Only needed with this backend, and slow to import
+        body = json.dumps({"description": transaction.description, "amount": transaction.amount, "direction": transaction.direction}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.loads(response.read())
+        usage = payload.get("usage")
+        self.last_usage = SimpleNamespace(**usage) if usage else None
+        return payload.get("category") or None
+
+class CascadeBackend(Backend):
+    """
+    Tries each backend in order and returns the first answer. Answers are passed back
+    to the other backends through `remember`, so the cache learns from the agent.
+    """
+    name = "cascade"
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.last_backend = None
+
+    @property
+    def delay(self):
+        return self.last_backend.delay if self.last_backend else 0
+
+    def categorize(self, transaction):
+        """
+        Return the first answer from the backends, in order. A backend that fails is passed over.
+
+        :raises Exception: The last backend error, if no backend answered and at least one failed.
+        """
+        self.last_backend = None
+        error = None
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                category = backend.categorize(transaction)
+            except Exception as e:
+                self.last_backend = backend  # So its delay still applies, e.g. after a rate limit
+                metrics.record_call(backend.name, time.perf_counter() - start, error=e)
+                logging.warning(f"Categorization backend {backend.name} failed: {e}")
+                error = e
+                continue
+            metrics.record_call(backend.name, time.perf_counter() - start, usage=getattr(backend, "last_usage", None), hit=category is not None)
+            if category is not None:
+                self.last_backend = backend
+                for other in self.backends:
+                    if other is not backend:
+                        other.remember(transaction, category)
+                return category
+        if error is not None:
+            raise error
+        return None
+
+def create_backend(db, names=None):
+    """
+    Build the categorization cascade.
+
+    :param names: Comma-separated backend names (rules, cache, local, agent, http). Defaults to
+                  PENGESJEKK_BACKENDS or DEFAULT_BACKENDS. The http backend posts to PENGESJEKK_CATEGORIZER_URL.
+                  Backends that are unavailable (like the agent without an API key) are left out with a warning.
+    :raises CategorizerUnavailable: If none of the backends can be used.
+    """
+    names = names or os.environ.get("PENGESJEKK_BACKENDS", DEFAULT_BACKENDS)
+    examples = []
+    if any(name.strip() in ("cache", "local") for name in names.split(",")):
+        examples = db.fetch_category_examples()
+
+    backends = []
+    reasons = []
+    for name in names.split(","):
+        name = name.strip()
+        if name == "rules":
+            backends.append(RulesBackend(load_rules()))
+        elif name == "cache":
+            backends.append(CacheBackend(examples))
+        elif name == "local":
+            backends.append(LocalModelBackend(examples))
+        elif name == "agent":
+            try:
+                backends.append(MistralAgentBackend())
+            except CategorizerUnavailable as e:
+                reasons.append(str(e))
+        elif name == "http":
+            url = os.environ.get("PENGESJEKK_CATEGORIZER_URL")
+            if url:
+                backends.append(HttpBackend(url))
+            else:
+                reasons.append("Mangler adresse i miljøvariabelen PENGESJEKK_CATEGORIZER_URL.")
+        elif name:
+            reasons.append(f"Ukjent kategoriseringsbackend: {name}")
+
+    if not backends:
+        raise CategorizerUnavailable(" ".join(reasons) or "Ingen kategoriseringsbackend er valgt.")
+    # Without a remote backend the cascade can only repeat what it has seen, which is still useful
+    for reason in reasons:
+        logging.warning(f"Categorization backend left out: {reason}")
+    return CascadeBackend(backends)
+
+def load_rules(path="categorization_rules.json"):
+    """Load keyword rules from a JSON list of [keyword, category] pairs, if the file exists."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [tuple(rule) for rule in json.load(f)]
+
+def categorize_transaction(backend, transaction):
+    category = backend.categorize(transaction)
+    if category is None:
+        return None
+    # Rules and learned answers are the user's own categories; only correct what a remote model made up
+    source = (getattr(backend, "last_backend", None) or backend).name
+    if source in REMOTE_BACKENDS and transaction.direction == "Inntekt" and category not in ["Lønn", "Annen inntekt"]:
+        category = "Annen inntekt"
+        metrics.record_correction()
+        print("Corrected income category from bad agent output")
+    return category
+
+def categorize_transactions(db, transactions_to_categorize, batch_size=20, backend=None):
+    """
+    Categorize transactions with the backend cascade and write the results back in batches.
+
+    :param transactions_to_categorize: Transactions, full rows (id, Dato, Beskrivelse, Beløp, Retning, Kategori),
+                                       or transaction IDs (bare or as 1-tuples) to fetch in one query.
+    :param batch_size: Number of results to buffer before they are committed.
+    :param backend: The backend to use. Defaults to create_backend(db).
+    """
+    backend = backend or create_backend(db)
+
+    transactions = [t if isinstance(t, Transaction) else Transaction.from_row(None, t)
+                    for t in transactions_to_categorize if isinstance(t, (tuple, list)) and len(t) >= 6]
+    transaction_ids = [t[0] if isinstance(t, (tuple, list)) else t for t in transactions_to_categorize
+                       if not (isinstance(t, (tuple, list)) and len(t) >= 6)]
+    if transaction_ids:
+        transactions += db.fetch_transactions_by_ids(transaction_ids)
+
+    updates = []
+    try:
+        for transaction in transactions:
+            if not transaction.category:  # Check if Kategori is empty
+                category = categorize_transaction(backend, transaction)
+                if category is None:
+                    continue
+                updates.append((transaction.id, category))
+                print(f"Categorized transaction ID {transaction.id} as {category}")
+                if len(updates) >= batch_size:
+                    db.update_categories(updates)
+                    updates = []
+                time.sleep(backend.delay)
+    finally:
+        # Keep the results we already paid for, even if the agent call failed
+        if updates:
+            db.update_categories(updates)
+
+class CategorizationWorker(threading.Thread):
+    """
+    Drains the categorization_jobs queue in a background thread.
+
+    The worker opens its own database connection, since sqlite3 connections can't be
+    shared between threads. Results are posted to `events` as (kind, data) tuples,
+    which the GUI polls with root.after. Per-job events carry
+    (transaction_id, category or error, jobs remaining) so the GUI can show progress.
+    Jobs are claimed `batch_size` at a time and their results committed together, or
+    every `flush_interval` seconds with slow backends, so a closed app loses at most a
+    few answers. Events for categorized jobs are posted only after their commit, so the
+    GUI never shows a category that isn't in the database yet.
+    """
+    def __init__(self, db_name, delay=None, batch_size=20, backend_names=None, flush_interval=10):
+        super().__init__(daemon=True)
+        self.db_name = db_name
+        self.batch_size = batch_size  # Jobs claimed and committed together
+        self.flush_interval = flush_interval  # Longest time in seconds results wait for their commit
+        self.delay = delay  # Pause between calls; None uses the answering backend's delay
+        self.backend_names = backend_names
+        self.events = queue.Queue()
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        db = Database(self.db_name)
+        try:
+            backend = create_backend(db, self.backend_names)
+        except Exception as e:
+            self.events.put(("error", str(e)))
+            self.events.put(("finished", None))
+            return
+
+        self.events.put(("started", db.count_categorization_jobs('pending')))
+        while not self.stop_event.is_set():
+            jobs = db.claim_categorization_jobs(self.batch_size)
+            if not jobs:
+                break
+            pending = db.count_categorization_jobs('pending')
+            results = []
+            events = []  # Posted once their results are committed
+            flushed = time.monotonic()
+            for index, transaction in enumerate(jobs):
+                if self.stop_event.is_set():
+                    db.release_categorization_jobs([job.id for job in jobs[index:]])
+                    break
+                remaining = pending + len(jobs) - index - 1
+                if transaction.category:  # Categorized by the user since it was queued
+                    results.append((transaction.id, None, None))
+                    events.append(("skipped", (transaction.id, None, remaining)))
+                    continue
+                try:
+                    category = categorize_transaction(backend, transaction)
+                    if category is None:
+                        raise CategorizerUnavailable("Ingen backend ga en kategori.")
+                except Exception as e:
+                    db.fail_categorization_job(transaction.id, e, MAX_ATTEMPTS)
+                    self.events.put(("failed", (transaction.id, str(e), remaining)))
+                else:
+                    # Record which backend answered, so overrides can be counted per source
+                    results.append((transaction.id, category, (getattr(backend, "last_backend", None) or backend).name))
+                    events.append(("categorized", (transaction.id, category, remaining)))
+                    print(f"Categorized transaction ID {transaction.id} as {category}")
+                if time.monotonic() - flushed >= self.flush_interval:
+                    self.flush(db, results, events)
+                    results, events = [], []
+                    flushed = time.monotonic()
+                self.stop_event.wait(self.delay if self.delay is not None else backend.delay)
+            self.flush(db, results, events)
+
+        # Nothing should be left in flight here, but never strand a job
+        db.reset_in_flight_categorization_jobs()
+        db.conn.close()
+        self.events.put(("finished", None))
+
+    def flush(self, db, results, events):
+        """Commit the buffered results, then post their events."""
+        applied = set(db.complete_categorization_jobs(results)) if results else set()
+        for kind, data in events:
+            if kind == "categorized" and data[0] not in applied:
+                # The user categorized the transaction while it was in flight, and their category was kept
+                kind, data = "skipped", (data[0], None, data[2])
+            self.events.put((kind, data))
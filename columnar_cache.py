@@ -0,0 +1,191 @@
+"""
+Optional in-memory cache of transactions in columns, one per account, for aggregating
+with NumPy instead of looping over row tuples.
+
+Each account is loaded once into NumPy arrays: ID, date as days since 1970, month,
+amount in øre, direction code, category ID and description ID. Categories and descriptions
+are interned, so every distinct string is stored only once. That is a few dozen bytes
+per transaction, against several hundred for a tuple of Python objects.
+
+The cache listens to the database and patches itself on inserts, updates and deletes
+made through the same connection. The categorization worker writes through its own
+connection, but the GUI passes its commits on with Database.notify, so they are patched
+in the same way. Every notified transaction ID stands for one row change, and the
+database counts the row changes of all connections (Database.change_count). If the count
+holds more changes than were notified, someone else wrote too, and the cache reloads.
+
+NumPy is optional. get_cache returns None without it, and callers fall back to SQL.
+"""
+import weakref
+from datetime import date
+from database import split_search
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EPOCH = date(1970, 1, 1).toordinal()
+DIRECTION_CODES = {"Inntekt": 1, "Utgift": 2}  # Anything else is 0
+
+caches = weakref.WeakKeyDictionary()  # Database -> ColumnarCache, shared by the tabs
+
+def get_cache(db):
+    """Return the ColumnarCache for `db`, created on first use, or None if NumPy isn't installed."""
+    if np is None:
+        return None
+    if db not in caches:
+        caches[db] = ColumnarCache(db)
+    return caches[db]
+
+class AccountColumns:
+    """The transactions of one account (or all accounts) as NumPy arrays, sorted on ID."""
+    def __init__(self, batches):
+        """
+        :param batches: Lists of Transactions in ID order, e.g. from Database.iter_transaction_batches.
+        """
+        self.categories = []  # Category ID -> name
+        self.category_index = {}  # Name -> category ID
+        self.descriptions = []  # Description ID -> text
+        self.description_index = {}
+        self.lowercase_descriptions = []
+        # Convert one batch at a time, so the rows never all exist as Python objects at once
+        chunks = [self.to_columns(batch) for batch in batches] or [self.to_columns([])]
+        self.set_columns([np.concatenate(parts) for parts in zip(*chunks)])
+
+    def intern_category(self, category):
+        category = category or ""
+        if category not in self.category_index:
+            self.category_index[category] = len(self.categories)
+            self.categories.append(category)
+        return self.category_index[category]
+
+    def intern_description(self, description):
+        description = description or ""
+        if description not in self.description_index:
+            self.description_index[description] = len(self.descriptions)
+            self.descriptions.append(description)
+            self.lowercase_descriptions.append(description.lower())
+        return self.description_index[description]
+
+    def to_columns(self, rows):
+        count = len(rows)
+        return (
+            np.fromiter((row.id for row in rows), np.int64, count),
+            np.fromiter((row.date.toordinal() - EPOCH for row in rows), np.int32, count),
+            np.fromiter((row.date.year * 12 + row.date.month - 1 for row in rows), np.int32, count),
+            np.fromiter((round(row.amount * 100) for row in rows), np.int64, count),
+            np.fromiter((DIRECTION_CODES.get(row.direction, 0) for row in rows), np.int8, count),
+            np.fromiter((self.intern_category(row.category) for row in rows), np.int32, count),
+            np.fromiter((self.intern_description(row.description) for row in rows), np.int32, count),
+        )
+
+    def columns(self):
+        return [self.ids, self.days, self.months, self.amounts, self.directions, self.category_ids, self.description_ids]
+
+    def set_columns(self, columns):
+        self.ids, self.days, self.months, self.amounts, self.directions, self.category_ids, self.description_ids = columns
+
+    def upsert(self, rows):
+        """Update rows that are already loaded and add the rest."""
+        if not rows:
+            return
+        new_columns = self.to_columns(rows)
+        positions = np.searchsorted(self.ids, new_columns[0])
+        existing = (positions < len(self.ids)) & (self.ids[np.minimum(positions, len(self.ids) - 1)] == new_columns[0]) if len(self.ids) else np.zeros(len(rows), bool)
+        columns = self.columns()
+        for column, new_column in zip(columns, new_columns):
+            column[positions[existing]] = new_column[existing]
+        columns = [np.concatenate([column, new_column[~existing]]) for column, new_column in zip(columns, new_columns)]
+        if len(columns[0]) and not np.all(columns[0][:-1] <= columns[0][1:]):
+            order = np.argsort(columns[0], kind="stable")
+            columns = [column[order] for column in columns]
+        self.set_columns(columns)
+
+    def remove(self, transaction_ids):
+        keep = ~np.isin(self.ids, np.asarray(list(transaction_ids), np.int64))
+        self.set_columns([column[keep] for column in self.columns()])
+
+    def mask(self, from_date=None, to_date=None, direction=None, search=None):
+        """
+        Return a boolean array selecting the transactions that match, like build_transaction_filter.
+
+        :param direction: "Inntekt" or "Utgift"; None or "Alle" for both.
+        :param search: Text to find in the description, or in the category with a "kat:" prefix.
+        """
+        mask = np.ones(len(self.ids), bool)
+        if from_date:
+            mask &= self.days >= from_date.toordinal() - EPOCH
+        if to_date:
+            mask &= self.days <= to_date.toordinal() - EPOCH
+        if direction and direction != "Alle":
+            mask &= self.directions == DIRECTION_CODES.get(direction, 0)
+        column, term = split_search(search)
+        if term:
+            mask &= self.text_mask(column, term)
+        return mask
+
+    def text_mask(self, column, term):
+        """Select the transactions whose Beskrivelse (or Kategori) contains the lowercased `term`."""
+        # Match each distinct string once, then select rows by their interned ID
+        if column == "Kategori":
+            matching = [index for index, category in enumerate(self.categories) if term in category.lower()]
+            return np.isin(self.category_ids, matching)
+        matching = [index for index, description in enumerate(self.lowercase_descriptions) if term in description]
+        return np.isin(self.description_ids, matching)
+
+    def category_totals(self, mask):
+        """Return {category: total in kroner} for the selected transactions."""
+        category_ids = self.category_ids[mask]
+        counts = np.bincount(category_ids, minlength=len(self.categories))
+        totals = np.bincount(category_ids, weights=self.amounts[mask], minlength=len(self.categories))
+        return {self.categories[index]: float(totals[index]) / 100 for index in np.flatnonzero(counts)}
+
+    def monthly_totals(self, mask):
+        """Return {(year, month): total in kroner} for the selected transactions, in date order."""
+        months = self.months[mask]
+        if not len(months):
+            return {}
+        first = months.min()
+        counts = np.bincount(months - first)
+        totals = np.bincount(months - first, weights=self.amounts[mask])
+        monthly = {}
+        for index in np.flatnonzero(counts):
+            year, month = divmod(int(first + index), 12)
+            monthly[(year, month + 1)] = float(totals[index]) / 100
+        return monthly
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns())
+
+class ColumnarCache:
+    """Columns per account, loaded on first use and kept in sync with the database."""
+    def __init__(self, db):
+        self.db_ref = weakref.ref(db)  # The database holds the cache as a listener; don't keep it alive
+        self.accounts = {}  # account_id (None for all accounts) -> AccountColumns
+        self.change_count = None  # Row changes in the database that the columns account for
+        db.add_listener(self.on_transactions_changed)
+
+    @property
+    def db(self):
+        return self.db_ref()
+
+    def get(self, account_id):
+        change_count = self.db.change_count()
+        if change_count != self.change_count:
+            # Changes nobody notified us about, e.g. from another process: the patched columns can't be trusted
+            self.accounts.clear()
+            self.change_count = change_count
+        if account_id not in self.accounts:
+            self.accounts[account_id] = AccountColumns(self.db.iter_transaction_batches(account_id=account_id, order_by="ID"))
+        return self.accounts[account_id]
+
+    def on_transactions_changed(self, kind, transaction_ids):
+        for account_id, columns in self.accounts.items():
+            if kind == "deleted":
+                columns.remove(transaction_ids)
+            else:
+                columns.upsert(self.db.fetch_transactions_by_ids(transaction_ids, account_id))
+        # Account for exactly these changes; anything else committed since still forces a reload
+        if self.change_count is not None:
+            self.change_count += len(transaction_ids)
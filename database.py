@@ -1,13 +1,199 @@
 import sqlite3
+import functools
 import hashlib
+import inspect
 import logging
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple
+from query_cache import QueryCache, MISSING
+from account_registry import AccountRegistry
+from event_bus import EventBus, TRANSACTIONS_INSERTED, TRANSACTIONS_DELETED, CATEGORY_CHANGED, ACCOUNT_CHANGED
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Dato is stored as dd.mm.yyyy; this expression turns it into a sortable yyyymmdd key.
+# Queries must use the exact same expression to get the index on it.
+DATE_KEY = "(substr(Dato, 7, 4) || substr(Dato, 4, 2) || substr(Dato, 1, 2))"
+
+# Treeview column -> SQL sort expression. All but Retning have an (account_id, key, id) index.
+SORT_COLUMNS = {
+    "ID": "id",
+    "Dato": DATE_KEY,
+    "Beskrivelse": "Beskrivelse",
+    "Beløp": "Beløp",
+    "Retning": "Retning",
+    "Kategori": "Kategori",
+}
+
+# Rows fetched per round trip when streaming; large enough to amortize the calls, small enough to keep memory flat
+STREAM_BATCH_SIZE = 2000
+
+@lru_cache(maxsize=8192)
+def parse_date(text):
+    """Parse a dd.mm.yyyy Dato. Cached, since the same few hundred dates repeat across many rows."""
+    if not text:
+        return None
+    return date(int(text[6:10]), int(text[3:5]), int(text[0:2]))
+
+def date_argument(text):
+    """Parse a dd.mm.yyyy date given on the command line, for argparse's type=. Unlike parse_date, it checks the input."""
+    try:
+        day, month, year = text.split(".")
+        if len(year) != 4:
+            raise ValueError(text)
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        import argparse  # Only the command-line tools get here
+        raise argparse.ArgumentTypeError(f"expected a date as dd.mm.yyyy, got {text!r}")
+
+@lru_cache(maxsize=8192)
+def format_date(day):
+    """Format a date as dd.mm.yyyy. Cached like parse_date, since strftime is slow compared to a lookup."""
+    return day.strftime("%d.%m.%Y") if day else ""
+
+class Transaction(NamedTuple):
+    """
+    A transaction row. The date is parsed and the amount numeric already when the row is
+    fetched, so consumers never call strptime or float() on them. Being a tuple with
+    __slots__ = (), it is as compact as the plain tuples it replaces, and the ID is still row[0].
+    """
+    id: int
+    date: date
+    description: str
+    amount: float
+    direction: str
+    category: str
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        # Used as the cursor's row_factory for SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori
+        return cls(row[0], parse_date(row[1]), row[2], row[3] or 0.0, row[4], row[5] or "")
+
+    def date_text(self):
+        return format_date(self.date)
+
+def to_date_key(value):
+    """Convert a date, datetime or dd.mm.yyyy string to the yyyymmdd form of DATE_KEY."""
+    if isinstance(value, str):
+        day, month, year = value.split(".")
+        return f"{year}{month}{day}"
+    return value.strftime("%Y%m%d")
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def split_search(search):
+    """Split search text into the column it applies to and the lowercased term, e.g. "kat:Mat" -> ("Kategori", "mat")."""
+    search = (search or "").strip().lower()
+    if search.startswith("kat:"):
+        return "Kategori", search[4:]
+    return "Beskrivelse", search
+
+def search_condition(column, term):
+    """Return (condition, params) selecting rows where `column` contains the lowercased `term`."""
+    if term.isascii():
+        # LIKE is case-insensitive for ASCII and runs in C
+        return f"{column} LIKE ? ESCAPE '\\'", [f"%{escape_like(term)}%"]
+    # SQLite's lower() only knows ASCII, so use Python's for æ, ø and å
+    return f"instr(py_lower({column}), ?) > 0", [term]
+
+def build_transaction_filter(account_id=None, search=None, from_date=None, to_date=None, direction=None, category=None, transaction_ids=None):
+    """
+    Turn the filter state from the GUI into one parameterized WHERE clause.
+
+    :param account_id: Only transactions in this account.
+    :param search: Text to find in Beskrivelse, or in Kategori with a "kat:" prefix. Case-insensitive.
+    :param from_date: First date to include (date, datetime or dd.mm.yyyy).
+    :param to_date: Last date to include.
+    :param direction: "Inntekt" or "Utgift"; None or "Alle" for both.
+    :param category: Exact category.
+    :param transaction_ids: Only these transactions.
+    :return: A tuple (where, params), where `where` is empty or starts with " WHERE".
+    """
+    conditions = []
+    params = []
+    if account_id:
+        conditions.append("account_id = ?")
+        params.append(account_id)
+    if from_date and to_date:
+        # Same expression as idx_transactions_date, so the range is an index search
+        conditions.append(f"{DATE_KEY} BETWEEN ? AND ?")
+        params += [to_date_key(from_date), to_date_key(to_date)]
+    elif from_date:
+        conditions.append(f"{DATE_KEY} >= ?")
+        params.append(to_date_key(from_date))
+    elif to_date:
+        conditions.append(f"{DATE_KEY} <= ?")
+        params.append(to_date_key(to_date))
+    if direction and direction != "Alle":
+        conditions.append("Retning = ?")
+        params.append(direction)
+    if category is not None:
+        conditions.append("Kategori = ?")
+        params.append(category)
+    column, search = split_search(search)
+    if search:
+        condition, condition_params = search_condition(column, search)
+        conditions.append(condition)
+        params += condition_params
+    if transaction_ids is not None:
+        transaction_ids = [int(transaction_id) for transaction_id in transaction_ids]
+        conditions.append(f"id IN ({', '.join('?' * len(transaction_ids))})")
+        params += transaction_ids
+    if not conditions:
+        return "", params
+    return " WHERE " + " AND ".join(conditions), params
+
+def order_clause(order_by, descending=False):
+    if not order_by:
+        return ""
+    direction = "DESC" if descending else "ASC"
+    return f" ORDER BY {SORT_COLUMNS[order_by]} {direction}, id {direction}"
+
+def cached_query(method):
+    """
+    Serve repeated calls of a Database read method from its query_cache. The key holds the
+    arguments and the write generation of the account they read, so a write to that account
+    (or any write, for queries over all accounts) gives a new key. Lists and dicts are
+    returned as copies, so callers may modify them.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        filters = arguments.arguments.pop("filters", {})
+        del arguments.arguments["self"]
+        account_id = arguments.arguments.get("account_id", filters.get("account_id"))
+        key = (method.__name__, tuple(arguments.arguments.items()), tuple(sorted(filters.items())), self.cache_generation(account_id))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)  # E.g. a list of transaction IDs; not worth caching
+        result = self.query_cache.get(method.__name__, key)
+        if result is MISSING:
+            result = method(self, *args, **kwargs)
+            self.query_cache.put(key, result)
+        return result.copy() if isinstance(result, (list, dict)) else result
+    return wrapper
+
 class Database:
     def __init__(self, db_name='transactions.db'):
+        self.db_name = db_name
+        self.listeners = []
+        self.events = EventBus()  # Typed change events for the views; see event_bus.py
+        self.account_registry = AccountRegistry(self)  # Accounts with their combobox labels, shared by the tabs
+        self.generation = 0  # Bumped on every change to transactions made through this connection
+        self.account_generations = {}  # account_id -> the generation of the last change to that account
+        self.query_cache = QueryCache()
+        self.cache_version = None  # PRAGMA data_version the query cache was filled at
         self.conn = sqlite3.connect(db_name)
+        self.conn.create_function("py_lower", 1, lambda text: text.lower() if text else text, deterministic=True)
+        # WAL lets the background categorization worker write while the GUI reads
+        self.conn.execute("PRAGMA journal_mode=WAL")
         self.create_tables()
         logging.debug("Database initialized and tables created.")
 
@@ -44,10 +230,111 @@ class Database:
                                  actual_amount REAL,
                                  FOREIGN KEY (account_id) REFERENCES accounts (id))''')
 
+            # Durable queue for the categorization worker
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS categorization_jobs (
+                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                 transaction_id INTEGER NOT NULL UNIQUE,
+                                 state TEXT NOT NULL DEFAULT 'pending',
+                                 attempts INTEGER NOT NULL DEFAULT 0,
+                                 last_error TEXT,
+                                 category TEXT,
+                                 source TEXT,
+                                 updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                                 FOREIGN KEY (transaction_id) REFERENCES transactions (id))''')
+            # The category and source columns hold the answer and the backend that gave it (agent, rules, cache, ...),
+            # used to measure how often users override each backend
+            columns = [column[1] for column in self.conn.execute("PRAGMA table_info(categorization_jobs)")]
+            if 'category' not in columns:
+                self.conn.execute("ALTER TABLE categorization_jobs ADD COLUMN category TEXT")
+            if 'source' not in columns:
+                self.conn.execute("ALTER TABLE categorization_jobs ADD COLUMN source TEXT")
+            self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_categorization_jobs_state
+                                 ON categorization_jobs (state, id)''')
+
+            # Count every row change to transactions, from any connection or process, so a cache can
+            # tell whether the changes it was told about are all there is (see change_count)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS transaction_changes (count INTEGER NOT NULL)")
+            if self.conn.execute("SELECT COUNT(*) FROM transaction_changes").fetchone()[0] == 0:
+                self.conn.execute("INSERT INTO transaction_changes (count) VALUES (0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                self.conn.execute(f"CREATE TRIGGER IF NOT EXISTS count_transaction_{event.lower()} AFTER {event} ON transactions"
+                                  " BEGIN UPDATE transaction_changes SET count = count + 1; END")
+
+            # Partial index so finding uncategorized transactions only touches those rows
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_uncategorized ON transactions (account_id)"
+                              " WHERE Kategori IS NULL OR Kategori = ''")
+
+            # Indexes for sorting the transaction list, with the ID as a stable tiebreak
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (account_id, {DATE_KEY}, id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_amount ON transactions (account_id, Beløp, id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (account_id, Kategori, id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_description ON transactions (account_id, Beskrivelse, id)")
+
+    def add_listener(self, callback):
+        """
+        Register a callback(kind, transaction_ids) that is called right after transactions change,
+        before the events on `events` are published. Meant for caches that must stay exact; views
+        should subscribe to `events` instead.
+
+        :param callback: Called with kind "inserted", "updated" or "deleted" and the affected IDs.
+        """
+        self.listeners.append(callback)
+
+    def query_transactions(self, query, params=()):
+        """Run a query selecting id, Dato, Beskrivelse, Beløp, Retning, Kategori and return a cursor yielding Transactions."""
+        cursor = self.conn.execute(query, params)
+        cursor.row_factory = Transaction.from_row
+        return cursor
+
+    def notify(self, kind, transaction_ids, account_ids=None):
+        """
+        Bump the write generations, call the listeners and publish the change on `events`.
+
+        :param account_ids: The accounts the transactions belong to; looked up if not given.
+        """
+        transaction_ids = [int(transaction_id) for transaction_id in transaction_ids]
+        if transaction_ids:
+            if account_ids is None:
+                account_ids = self.fetch_account_ids(transaction_ids)
+            self.generation += 1
+            for account_id in account_ids:
+                self.account_generations[account_id] = self.generation
+            for callback in self.listeners:
+                callback(kind, transaction_ids)
+            # All updates to transactions are category changes
+            event = {"inserted": TRANSACTIONS_INSERTED, "updated": CATEGORY_CHANGED, "deleted": TRANSACTIONS_DELETED}[kind]
+            self.events.publish(event, transaction_ids, account_ids)
+
+    def fetch_account_ids(self, transaction_ids):
+        """Return the IDs of the accounts the transactions belong to."""
+        transaction_ids = list(transaction_ids)
+        account_ids = set()
+        with self.conn:
+            for start in range(0, len(transaction_ids), 900):
+                chunk = transaction_ids[start:start + 900]
+                cursor = self.conn.execute(f"SELECT DISTINCT account_id FROM transactions WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+                account_ids.update(account_id for account_id, in cursor)
+        return account_ids
+
+    def cache_generation(self, account_id=None):
+        """
+        Return the write generation for query_cache keys: the last change to `account_id`,
+        or to any account if it is None. Changes committed by other connections can't be
+        attributed to an account, so they clear the cache instead.
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self.cache_version:
+            self.query_cache.clear()
+            self.cache_version = version
+        if account_id:
+            return self.account_generations.get(account_id, 0)
+        return self.generation
+
     def insert_account(self, name, account_number, notes):
         with self.conn:
-            self.conn.execute("INSERT INTO accounts (name, account_number, notes) VALUES (?, ?, ?)", (name, account_number, notes))
+            cursor = self.conn.execute("INSERT INTO accounts (name, account_number, notes) VALUES (?, ?, ?)", (name, account_number, notes))
             logging.debug(f"Account inserted: {name}, {account_number}")
+        self.events.publish(ACCOUNT_CHANGED, account_ids=[cursor.lastrowid])
 
     def fetch_all_accounts(self):
         with self.conn:
@@ -60,13 +347,16 @@ class Database:
         with self.conn:
             self.conn.execute("UPDATE accounts SET name = ?, account_number = ?, notes = ? WHERE id = ?", (name, account_number, notes, account_id))
             logging.debug(f"Account updated: {account_id}, {name}")
+        self.events.publish(ACCOUNT_CHANGED, account_ids=[account_id])
 
     def delete_account(self, account_id):
         with self.conn:
             self.conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
             logging.debug(f"Account deleted: {account_id}")
+        self.events.publish(ACCOUNT_CHANGED, account_ids=[account_id])
 
     def insert_transactions(self, account_id, transactions):
+        inserted_ids = []
         with self.conn:
             for transaction in transactions:
                 # Calculate the MD5 hash of the description field
@@ -75,57 +365,262 @@ class Database:
                 cursor = self.conn.execute("SELECT id FROM transactions WHERE hash = ?", (description_hash,))
                 existing_transaction = cursor.fetchone()
                 if not existing_transaction:
-                    self.conn.execute("INSERT INTO transactions (account_id, Dato, Beskrivelse, Beløp, Retning, Kategori, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                       (account_id, transaction["Dato"], transaction["Beskrivelse"], float(transaction["Beløp"]), transaction["Retning"], transaction["Kategori"], description_hash))
+                    cursor = self.conn.execute("INSERT INTO transactions (account_id, Dato, Beskrivelse, Beløp, Retning, Kategori, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                               (account_id, transaction["Dato"], transaction["Beskrivelse"], float(transaction["Beløp"]), transaction["Retning"], transaction["Kategori"], description_hash))
+                    inserted_ids.append(cursor.lastrowid)
                     #logging.debug(f"Transaction inserted: {transaction}")
                 else:
                     logging.debug(f"Transaction skipped (already exists): {transaction}")
+        self.notify("inserted", inserted_ids, [account_id])
 
-    def fetch_all_transactions(self, account_id=None):
+    @cached_query
+    def fetch_all_transactions(self, account_id=None, order_by=None, descending=False):
+        """
+        Fetch all transactions, optionally for one account and sorted in SQL.
+
+        :param order_by: A key in SORT_COLUMNS, e.g. "Dato". Ties are broken on ID.
+        :param descending: Sort in descending order.
+        """
+        order = order_clause(order_by, descending)
         with self.conn:
             if account_id:
-                cursor = self.conn.execute("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions WHERE account_id = ?", (account_id,))
+                cursor = self.query_transactions("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions WHERE account_id = ?" + order, (account_id,))
             else:
-                cursor = self.conn.execute("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions")
+                cursor = self.query_transactions("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions" + order)
             transactions = cursor.fetchall()
             logging.debug(f"Fetched {len(transactions)} transactions.")
             return transactions
 
     def fetch_transaction_by_id(self, transaction_id):
         with self.conn:
-            cursor = self.conn.execute("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions WHERE id = ?", (transaction_id,))
+            cursor = self.query_transactions("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions WHERE id = ?", (transaction_id,))
             transaction = cursor.fetchone()
             logging.debug(f"Fetched transaction by ID: {transaction_id}")
             return transaction
 
+    def fetch_transactions_by_ids(self, transaction_ids, account_id=None):
+        """
+        Fetch several transactions with one query per chunk of ids.
+
+        :param transaction_ids: List of transaction IDs.
+        :param account_id: If given, only transactions in this account are returned.
+        :return: A list of Transactions, in database order.
+        """
+        transaction_ids = list(transaction_ids)
+        transactions = []
+        with self.conn:
+            # Stay below SQLite's default limit on the number of query parameters
+            for start in range(0, len(transaction_ids), 900):
+                chunk = transaction_ids[start:start + 900]
+                placeholders = ", ".join("?" * len(chunk))
+                query = f"SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions WHERE id IN ({placeholders})"
+                if account_id:
+                    cursor = self.query_transactions(query + " AND account_id = ?", chunk + [account_id])
+                else:
+                    cursor = self.query_transactions(query, chunk)
+                transactions.extend(cursor.fetchall())
+        logging.debug(f"Fetched {len(transactions)} transactions by ID.")
+        return transactions
+
     def update_category(self, transaction_id, category):
         with self.conn:
             self.conn.execute("UPDATE transactions SET Kategori = ? WHERE id = ?", (category, transaction_id))
             logging.debug(f"Category updated for transaction ID: {transaction_id}")
+        self.notify("updated", [transaction_id])
 
     def delete_transaction(self, transaction_id):
+        self.delete_transactions([transaction_id])
+
+    def delete_transactions(self, transaction_ids):
+        """
+        Delete several transactions and their categorization jobs in one commit, with a single notification.
+
+        :param transaction_ids: List of transaction IDs.
+        """
+        transaction_ids = [int(transaction_id) for transaction_id in transaction_ids]
+        account_ids = self.fetch_account_ids(transaction_ids)  # Gone after the delete
         with self.conn:
-            self.conn.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-            logging.debug(f"Transaction deleted: {transaction_id}")
+            for start in range(0, len(transaction_ids), 900):
+                chunk = transaction_ids[start:start + 900]
+                placeholders = ", ".join("?" * len(chunk))
+                self.conn.execute(f"DELETE FROM transactions WHERE id IN ({placeholders})", chunk)
+                self.conn.execute(f"DELETE FROM categorization_jobs WHERE transaction_id IN ({placeholders})", chunk)
+            logging.debug(f"Transactions deleted: {len(transaction_ids)}")
+        self.notify("deleted", transaction_ids, account_ids)
 
-    def filter_transactions(self, month=None, category=None, account_id=None):
-        query = "SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions WHERE 1=1"
-        params = []
-        if account_id:
-            query += " AND account_id = ?"
-            params.append(account_id)
-        if month:
-            query += " AND strftime('%m', Dato) = ?"
-            params.append(month)
-        if category:
-            query += " AND Kategori = ?"
-            params.append(category)
-        with self.conn:
-            cursor = self.conn.execute(query, params)
+    @cached_query
+    def filter_transactions(self, order_by=None, descending=False, limit=None, offset=0, **filters):
+        """
+        Fetch the transactions matching the filters in a single query.
+
+        :param filters: Keyword arguments for build_transaction_filter (account_id, search, from_date, ...).
+        :param order_by: A key in SORT_COLUMNS. Ties are broken on ID.
+        :param limit: Maximum number of rows to return, starting at `offset`.
+        """
+        where, params = build_transaction_filter(**filters)
+        query = "SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions" + where + order_clause(order_by, descending)
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self.conn:
+            cursor = self.query_transactions(query, params)
             transactions = cursor.fetchall()
             logging.debug(f"Filtered transactions: {len(transactions)} results.")
             return transactions
 
+    @cached_query
+    def fetch_transaction_ids(self, order_by=None, descending=False, limit=None, offset=0, **filters):
+        """Return the IDs of the rows filter_transactions would return for the same arguments, e.g. to select them all."""
+        where, params = build_transaction_filter(**filters)
+        query = "SELECT id FROM transactions" + where + order_clause(order_by, descending)
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self.conn:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def iter_transaction_batches(self, order_by=None, descending=False, batch_size=STREAM_BATCH_SIZE, **filters):
+        """
+        Yield the transactions matching the filters as lists of at most `batch_size` Transactions,
+        so only one batch is in memory at a time. Takes the same arguments as filter_transactions.
+
+        The cursor keeps its read snapshot until the generator is exhausted or closed. Don't write
+        through the same connection while iterating.
+        """
+        where, params = build_transaction_filter(**filters)
+        cursor = self.query_transactions("SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions" + where + order_clause(order_by, descending), params)
+        cursor.arraysize = batch_size
+        count = 0
+        try:
+            while True:
+                batch = cursor.fetchmany()
+                if not batch:
+                    break
+                count += len(batch)
+                yield batch
+        finally:
+            cursor.close()
+            logging.debug(f"Streamed {count} transactions.")
+
+    def iter_transactions(self, order_by=None, descending=False, batch_size=STREAM_BATCH_SIZE, **filters):
+        """Yield the transactions matching the filters one at a time; see iter_transaction_batches."""
+        for batch in self.iter_transaction_batches(order_by, descending, batch_size, **filters):
+            yield from batch
+
+    @cached_query
+    def count_transactions(self, **filters):
+        where, params = build_transaction_filter(**filters)
+        with self.conn:
+            cursor = self.conn.execute("SELECT COUNT(*) FROM transactions" + where, params)
+            return cursor.fetchone()[0]
+
+    def data_version(self):
+        """
+        Return a value that changes whenever the transactions may have changed, also when
+        another connection (such as the categorization worker) committed the change.
+        """
+        with self.conn:
+            return self.generation, self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def change_count(self):
+        """
+        Return the number of rows inserted, updated or deleted in transactions so far, by any connection.
+        Each notify covers one change per transaction ID, so a listener can add those up and compare.
+        """
+        with self.conn:
+            return self.conn.execute("SELECT count FROM transaction_changes").fetchone()[0]
+
+    @cached_query
+    def summarize_transactions(self, **filters):
+        """
+        Count and total the transactions matching the filters, in the same query as filter_transactions.
+        Results are cached until the data changes, so calling this on every page flip is cheap.
+
+        :param filters: Keyword arguments for build_transaction_filter.
+        :return: A tuple (count, income, expenses).
+        """
+        where, params = build_transaction_filter(**filters)
+        with self.conn:
+            cursor = self.conn.execute("SELECT COUNT(*), TOTAL(CASE WHEN Retning = 'Inntekt' THEN Beløp END), "
+                                       "TOTAL(CASE WHEN Retning = 'Utgift' THEN Beløp END) FROM transactions" + where, params)
+            return cursor.fetchone()
+
+    @cached_query
+    def category_totals(self, **filters):
+        """
+        Sum the amounts per category for the transactions matching the filters, in SQL.
+
+        :param filters: Keyword arguments for build_transaction_filter, e.g. direction="Utgift".
+        :return: {category: total}, with "" for uncategorized transactions.
+        """
+        where, params = build_transaction_filter(**filters)
+        with self.conn:
+            cursor = self.conn.execute("SELECT COALESCE(Kategori, ''), TOTAL(Beløp) FROM transactions" + where + " GROUP BY 1", params)
+            return dict(cursor.fetchall())
+
+    @cached_query
+    def monthly_totals(self, **filters):
+        """
+        Sum the amounts per month for the transactions matching the filters, in SQL.
+
+        :return: {(year, month): total} in date order.
+        """
+        where, params = build_transaction_filter(**filters)
+        with self.conn:
+            cursor = self.conn.execute("SELECT CAST(substr(Dato, 7, 4) AS INTEGER) AS year, CAST(substr(Dato, 4, 2) AS INTEGER) AS month, TOTAL(Beløp) "
+                                       "FROM transactions" + where + " GROUP BY year, month ORDER BY year, month", params)
+            return {(year, month): total for year, month, total in cursor}
+
+    @cached_query
+    def monthly_totals_by_term(self, terms, **filters):
+        """
+        Sum the amounts per month separately for each search term, in one query: one
+        TOTAL(CASE ...) column per term, grouped by month.
+
+        :param terms: A tuple of lowercased terms. A term matches the description or the category;
+                      with a "kat:" prefix it matches only the category. A row can count for several terms.
+        :param filters: Keyword arguments for build_transaction_filter, e.g. account_id and the period.
+        :return: {(year, month): [total per term]} in date order, for months where some term matched.
+        """
+        if not terms:
+            return {}
+        where, params = build_transaction_filter(**filters)
+        cases, case_params = [], []
+        matches, match_params = [], []
+        for term in terms:
+            column, text = split_search(term)
+            if column == "Kategori":
+                condition, condition_params = search_condition("Kategori", text)
+            else:
+                description, description_params = search_condition("Beskrivelse", text)
+                category, category_params = search_condition("Kategori", text)
+                condition, condition_params = f"({description} OR {category})", description_params + category_params
+            cases.append(f"TOTAL(CASE WHEN {condition} THEN Beløp END)")
+            case_params += condition_params
+            matches.append(condition)
+            match_params += condition_params
+        # Only rows that match some term are grouped
+        where += (" AND " if where else " WHERE ") + "(" + " OR ".join(matches) + ")"
+        query = ("SELECT CAST(substr(Dato, 7, 4) AS INTEGER) AS year, CAST(substr(Dato, 4, 2) AS INTEGER) AS month, " + ", ".join(cases)
+                 + " FROM transactions" + where + " GROUP BY year, month ORDER BY year, month")
+        with self.conn:
+            cursor = self.conn.execute(query, case_params + params + match_params)
+            return {(row[0], row[1]): list(row[2:]) for row in cursor}
+
+    def explain_filter_query(self, order_by=None, descending=False, limit=None, offset=0, **filters):
+        """
+        Return SQLite's query plan for filter_transactions, e.g. to check which index it uses.
+
+        :return: A list of plan steps like "SEARCH transactions USING INDEX idx_transactions_date (...)".
+        """
+        where, params = build_transaction_filter(**filters)
+        query = "SELECT id, Dato, Beskrivelse, Beløp, Retning, Kategori FROM transactions" + where + order_clause(order_by, descending)
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self.conn:
+            return [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
     def bulk_update_categories(self, transaction_ids, category):
         """
         Update the category for multiple transactions at once.
@@ -137,6 +632,18 @@ class Database:
             for transaction_id in transaction_ids:
                 self.conn.execute("UPDATE transactions SET Kategori = ? WHERE id = ?", (category, transaction_id))
                 logging.debug(f"Category updated for transaction ID: {transaction_id}")
+        self.notify("updated", transaction_ids)
+
+    def update_categories(self, updates):
+        """
+        Update the category for multiple transactions in one commit.
+
+        :param updates: List of (transaction_id, category) tuples.
+        """
+        with self.conn:
+            self.conn.executemany("UPDATE transactions SET Kategori = ? WHERE id = ?", [(category, transaction_id) for transaction_id, category in updates])
+            logging.debug(f"Categories updated for {len(updates)} transactions.")
+        self.notify("updated", [transaction_id for transaction_id, category in updates])
 
     def save_budget(self, account_id, budget_data, budget_name):
         """
@@ -173,10 +680,157 @@ class Database:
             logging.debug(f"Fetched budgets for account ID: {account_id}")
             return list(budgets.items())
 
+    def enqueue_categorization_jobs(self, account_id=None, transaction_ids=None):
+        """
+        Queue uncategorized transactions for the categorization worker.
+
+        Finished or failed jobs for transactions that are still uncategorized are reset to pending.
+
+        :param account_id: Queue all uncategorized transactions for this account.
+        :param transaction_ids: Queue only these transactions (if they are uncategorized).
+        :return: The number of pending jobs after queueing.
+        """
+        upsert = (" ON CONFLICT (transaction_id) DO UPDATE SET state = 'pending', attempts = 0, last_error = NULL,"
+                  " updated_at = CURRENT_TIMESTAMP WHERE state IN ('done', 'failed')")
+        with self.conn:
+            if transaction_ids is not None:
+                for transaction_id in transaction_ids:
+                    self.conn.execute("INSERT INTO categorization_jobs (transaction_id) SELECT id FROM transactions"
+                                      " WHERE id = ? AND (Kategori IS NULL OR Kategori = '')" + upsert,
+                                      (transaction_id,))
+            elif account_id:
+                self.conn.execute("INSERT INTO categorization_jobs (transaction_id) SELECT id FROM transactions"
+                                  " WHERE account_id = ? AND (Kategori IS NULL OR Kategori = '')" + upsert,
+                                  (account_id,))
+            else:
+                self.conn.execute("INSERT INTO categorization_jobs (transaction_id) SELECT id FROM transactions"
+                                  " WHERE (Kategori IS NULL OR Kategori = '')" + upsert)
+        pending = self.count_categorization_jobs('pending')
+        logging.debug(f"Categorization jobs pending: {pending}")
+        return pending
+
+    def claim_categorization_jobs(self, limit=1):
+        """
+        Move up to `limit` pending jobs to in_flight and return their transactions.
+
+        :return: A list of Transactions.
+        """
+        with self.conn:
+            cursor = self.query_transactions("SELECT t.id, t.Dato, t.Beskrivelse, t.Beløp, t.Retning, t.Kategori"
+                                       " FROM categorization_jobs j JOIN transactions t ON t.id = j.transaction_id"
+                                       " WHERE j.state = 'pending' ORDER BY j.id LIMIT ?", (limit,))
+            transactions = cursor.fetchall()
+            for transaction in transactions:
+                self.conn.execute("UPDATE categorization_jobs SET state = 'in_flight', attempts = attempts + 1,"
+                                  " updated_at = CURRENT_TIMESTAMP WHERE transaction_id = ?", (transaction.id,))
+            logging.debug(f"Claimed {len(transactions)} categorization jobs.")
+            return transactions
+
+    def complete_categorization_jobs(self, results):
+        """
+        Mark jobs as done, storing their categories in a single database transaction.
+
+        Categories are only written to transactions that are still uncategorized, so a
+        category set by the user while the job was in flight is kept.
+
+        :param results: List of (transaction_id, category, source) tuples, where source is the name of
+                        the backend that answered. Use None as category and source for transactions
+                        that were already categorized.
+        :return: The IDs of the transactions that got their category.
+        """
+        applied = []
+        with self.conn:
+            for transaction_id, category, source in results:
+                if category is None:
+                    continue
+                cursor = self.conn.execute("UPDATE transactions SET Kategori = ? WHERE id = ? AND (Kategori IS NULL OR Kategori = '')",
+                                           (category, transaction_id))
+                if cursor.rowcount:
+                    applied.append(transaction_id)
+            # A job whose answer wasn't used records no category, so it isn't counted as categorized or overridden
+            used = set(applied)
+            self.conn.executemany("UPDATE categorization_jobs SET state = 'done', last_error = NULL, category = ?, source = ?,"
+                                  " updated_at = CURRENT_TIMESTAMP WHERE transaction_id = ?",
+                                  [(category, source, transaction_id) if transaction_id in used else (None, None, transaction_id)
+                                   for transaction_id, category, source in results])
+            logging.debug(f"Categorization jobs done: {len(results)}, categorized: {len(applied)}")
+        self.notify("updated", applied)
+        return applied
+
+    def fail_categorization_job(self, transaction_id, error, max_attempts):
+        """
+        Record a failed attempt. The job goes back to pending until it has used `max_attempts`.
+        """
+        with self.conn:
+            self.conn.execute("UPDATE categorization_jobs SET last_error = ?, updated_at = CURRENT_TIMESTAMP,"
+                              " state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END"
+                              " WHERE transaction_id = ?", (str(error), max_attempts, transaction_id))
+            logging.debug(f"Categorization job failed for transaction ID: {transaction_id}: {error}")
+
+    def release_categorization_jobs(self, transaction_ids):
+        """
+        Put claimed jobs that were never tried back in the queue, giving back the attempt
+        claim_categorization_jobs counted, so a cancel doesn't move them towards 'failed'.
+        """
+        transaction_ids = [int(transaction_id) for transaction_id in transaction_ids]
+        with self.conn:
+            self.conn.executemany("UPDATE categorization_jobs SET state = 'pending', attempts = MAX(attempts - 1, 0),"
+                                  " updated_at = CURRENT_TIMESTAMP WHERE state = 'in_flight' AND transaction_id = ?",
+                                  [(transaction_id,) for transaction_id in transaction_ids])
+            logging.debug(f"Released {len(transaction_ids)} untried categorization jobs.")
+
+    def reset_in_flight_categorization_jobs(self):
+        """
+        Put jobs that were in flight when the app stopped back in the queue.
+        """
+        with self.conn:
+            cursor = self.conn.execute("UPDATE categorization_jobs SET state = 'pending', updated_at = CURRENT_TIMESTAMP"
+                                       " WHERE state = 'in_flight'")
+            logging.debug(f"Reset {cursor.rowcount} in-flight categorization jobs.")
+
+    def count_categorization_jobs(self, state):
+        with self.conn:
+            cursor = self.conn.execute("SELECT COUNT(*) FROM categorization_jobs WHERE state = ?", (state,))
+            return cursor.fetchone()[0]
+
+    def fetch_category_examples(self):
+        """
+        Fetch (Beskrivelse, Kategori) for all categorized transactions, used to train the cache and local model.
+        """
+        with self.conn:
+            cursor = self.conn.execute("SELECT Beskrivelse, Kategori FROM transactions WHERE Kategori IS NOT NULL AND Kategori != ''")
+            return cursor.fetchall()
+
+    def fetch_assigned_categories(self, transaction_ids):
+        """
+        Fetch the categories the categorization backends assigned to the given transactions.
+
+        :return: A dict mapping transaction ID to (source, category), for automatically categorized
+                 transactions only. The source is None for jobs finished before sources were recorded.
+        """
+        assigned_categories = {}
+        transaction_ids = [int(transaction_id) for transaction_id in transaction_ids]
+        with self.conn:
+            for start in range(0, len(transaction_ids), 900):
+                chunk = transaction_ids[start:start + 900]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor = self.conn.execute("SELECT transaction_id, source, category FROM categorization_jobs"
+                                           f" WHERE state = 'done' AND category IS NOT NULL AND transaction_id IN ({placeholders})", chunk)
+                assigned_categories.update((transaction_id, (source, category)) for transaction_id, source, category in cursor)
+        return assigned_categories
+
+    def fetch_override_stats(self):
+        """
+        Count automatically categorized transactions per source and how many of them the user has since changed.
+
+        :return: A dict mapping source (None if unknown) to a tuple (categorized, overridden).
+        """
+        with self.conn:
+            cursor = self.conn.execute("SELECT j.source, COUNT(*), COALESCE(SUM(t.Kategori IS NOT j.category), 0)"
+                                       " FROM categorization_jobs j JOIN transactions t ON t.id = j.transaction_id"
+                                       " WHERE j.state = 'done' AND j.category IS NOT NULL GROUP BY j.source")
+            return {source: (categorized, overridden) for source, categorized, overridden in cursor}
+
     def get_account_id(self, account_name, account_number):
-        # Fetch the account ID based on account name and number
-        accounts = self.fetch_all_accounts()
-        for account in accounts:
-            if account[1] == account_name and account[2] == account_number:
-                return account[0]  # Return the account ID
-        return None  # Return None if no matching account is found
\ No newline at end of file
+        # Look up the account ID by name and number; None if there is no such account
+        return self.account_registry.find(account_name, account_number)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+A small publish/subscribe bus for telling views that data changed.
+
+Database publishes on its `events` bus after each write:
+
+    transactions_inserted  new transactions were imported
+    transactions_deleted   transactions were deleted
+    category_changed       transactions got a new category
+    account_changed        an account was added, edited or deleted
+
+Subscribers are called as callback(event, transaction_ids, account_ids) on the thread
+that made the write. Views wrap their callback in IdleCoalescer, so a burst of events
+(an import, a categorization run) leads to one update when Tk is idle.
+"""
+TRANSACTIONS_INSERTED = "transactions_inserted"
+TRANSACTIONS_DELETED = "transactions_deleted"
+CATEGORY_CHANGED = "category_changed"
+ACCOUNT_CHANGED = "account_changed"
+TRANSACTION_EVENTS = (TRANSACTIONS_INSERTED, TRANSACTIONS_DELETED, CATEGORY_CHANGED)
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = {}  # event -> list of callbacks
+
+    def subscribe(self, events, callback):
+        """
+        Call `callback(event, transaction_ids, account_ids)` whenever one of `events` is published.
+
+        :param events: An event name or a sequence of them.
+        """
+        for event in ([events] if isinstance(events, str) else events):
+            self.subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, events, callback):
+        for event in ([events] if isinstance(events, str) else events):
+            if callback in self.subscribers.get(event, []):
+                self.subscribers[event].remove(callback)
+
+    def publish(self, event, transaction_ids=(), account_ids=()):
+        for callback in list(self.subscribers.get(event, [])):
+            callback(event, list(transaction_ids), list(account_ids))
+
+class IdleCoalescer:
+    """
+    A bus subscriber that collects events and passes them to `callback` in a single call
+    once Tk is idle. The callback gets {event: (set of transaction IDs, set of account IDs)}.
+    """
+    def __init__(self, widget, callback):
+        self.widget = widget
+        self.callback = callback
+        self.pending = {}
+        self.job = None
+
+    def __call__(self, event, transaction_ids, account_ids):
+        pending_transactions, pending_accounts = self.pending.setdefault(event, (set(), set()))
+        pending_transactions.update(transaction_ids)
+        pending_accounts.update(account_ids)
+        if self.job is None:
+            self.job = self.widget.after_idle(self.flush)
+
+    def flush(self):
+        self.job = None
+        pending, self.pending = self.pending, {}
+        if pending:
+            self.callback(pending)
+
+    def cancel(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        self.pending = {}
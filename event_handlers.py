@@ -1,147 +1,242 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import queue
+import time
 from datetime import datetime
-from file_handler import upload_file
-from categorizer import categorize_transactions
+from categorizer import CategorizationWorker
+from database import SORT_COLUMNS
+from metrics import metrics
+import reports
+from event_bus import IdleCoalescer, ACCOUNT_CHANGED
+
+SEARCH_DELAY_MS = 150  # Pause in typing before the search runs
 
 class EventHandler:
+    """
+    The behaviour of the transactions tab, shared by gui.py and gui_new.py. The app builds
+    the widgets and binds them to these methods; the handler reads and updates the widgets
+    and the view state (current account, page) through `app`.
+    """
     def __init__(self, app, db):
         self.app = app
         self.db = db
+        self.categorization_worker = None
+        self.export_worker = None
+        self.restart_categorization = False  # Set when Kategoriser is clicked while a cancelled worker winds down
+        self.sort_column = "Dato"
+        self.sort_descending = True
+        self.search_job = None
+        self.loaded_filters = None
+        self.result_count = 0  # Rows matching loaded_filters
+        self.db.add_listener(self.on_transactions_changed)
+        self.db.events.subscribe(ACCOUNT_CHANGED, IdleCoalescer(self.app.root, self.on_accounts_changed))
 
     def load_accounts(self):
-        accounts = self.db.fetch_all_accounts()
-        account_names = [f"{name} ({account_number})" for id, name, account_number, notes in accounts]
-        self.app.account_menu['values'] = account_names
-        if accounts:
-            self.app.account_var.set(account_names[0])
-            self.app.current_account_id = accounts[0][0]
-        else:
-            self.app.account_var.set("")
-            self.app.current_account_id = None
+        registry = self.db.account_registry
+        self.app.account_ids = registry.ids()  # Parallel to the combobox labels; the selected index gives the ID
+        self.app.account_menu['values'] = registry.label_list()
+        if self.app.current_account_id not in self.app.account_ids:
+            self.app.current_account_id = self.app.account_ids[0] if self.app.account_ids else None
+        self.app.account_var.set(registry.label(self.app.current_account_id))
+
+    def on_accounts_changed(self, changes):
+        self.load_accounts()
 
     def on_account_select(self, event):
-        selected_account = self.app.account_var.get()
-        if selected_account:
-            account_name, account_number = selected_account.split(" (")
-            account_number = account_number.rstrip(")")
-            accounts = self.db.fetch_all_accounts()
-            for account in accounts:
-                if account[1] == account_name and account[2] == account_number:
-                    self.app.current_account_id = account[0]
-                    self.app.current_page = 1
-                    self.display_transactions()
-                    break
+        index = self.app.account_menu.current()
+        if index >= 0:
+            self.app.current_account_id = self.app.account_ids[index]
+            self.app.current_page = 1  # Reset to the first page when switching accounts
+            self.display_transactions()
 
     def add_account(self):
         account_name = simpledialog.askstring("Legg til Konto", "Navn:")
         if account_name:
             account_number = simpledialog.askstring("Legg til Konto", "Kontonummer:")
             notes = simpledialog.askstring("Legg til Konto", "Notater:")
-            self.db.insert_account(account_name, account_number, notes)
-            self.load_accounts()
+            self.db.insert_account(account_name, account_number, notes)  # The account list reloads on ACCOUNT_CHANGED
 
     def handle_upload(self):
         if self.app.current_account_id is None:
             messagebox.showwarning("Advarsel", "Velg en konto først.")
             return
-        upload_file(self.db, self.app.current_account_id)
-        self.display_transactions()
+        from file_handler import upload_file  # Imported on first use; pandas is slow to import
+        upload_file(self.db, self.app.current_account_id)  # New rows arrive through on_transactions_changed
 
     def handle_categorize(self):
-        selected_items = self.app.tree.selection()
-        if selected_items:
-            transactions_to_categorize = [(self.app.tree.item(item, 'values')[0],) for item in selected_items if not self.app.tree.item(item, 'values')[5]]
+        transaction_ids = self.app.transaction_list.selected_ids()
+        if transaction_ids:
+            # Categorize only selected transactions (the queue skips categorized ones)
+            pending = self.db.enqueue_categorization_jobs(transaction_ids=transaction_ids)
         else:
-            transactions_to_categorize = self.db.fetch_all_transactions(self.app.current_account_id)
-            transactions_to_categorize = [(t[0],) for t in transactions_to_categorize if not t[5]]
+            # Categorize all uncategorized transactions
+            pending = self.db.enqueue_categorization_jobs(account_id=self.app.current_account_id)
 
-        if transactions_to_categorize:
-            categorize_transactions(self.db, transactions_to_categorize)
-            self.display_transactions()
+        if pending:
+            self.start_categorization_worker()
         else:
             messagebox.showinfo("Ingen Transaksjoner", "Ingen transaksjoner å kategorisere.")
 
+    def resume_categorization(self):
+        # Resume categorization jobs left over from the previous session
+        self.db.reset_in_flight_categorization_jobs()
+        if self.db.count_categorization_jobs('pending'):
+            self.start_categorization_worker()
+
+    def start_categorization_worker(self):
+        if self.categorization_worker and self.categorization_worker.is_alive():
+            # A running worker claims the new jobs itself; a cancelled one is replaced once it has exited
+            if self.categorization_worker.stop_event.is_set():
+                self.restart_categorization = True
+                self.app.categorize_progress_label.config(text="Avbryter, starter på nytt...")
+            return
+        self.restart_categorization = False
+        self.categorization_worker = CategorizationWorker(self.db.db_name)
+        self.categorization_started = time.monotonic()
+        self.categorization_processed = 0
+        self.app.categorize_progress['value'] = 0
+        self.app.cancel_categorize_button.config(state=tk.NORMAL)
+        self.categorization_worker.start()
+        self.app.root.after(100, self.poll_categorization_worker)
+
+    def cancel_categorize(self):
+        if self.categorization_worker:
+            # Remaining jobs stay pending and are resumed on the next run
+            self.categorization_worker.stop()
+            self.app.cancel_categorize_button.config(state=tk.DISABLED)
+            self.app.categorize_progress_label.config(text="Avbryter...")
+
+    def poll_categorization_worker(self):
+        finished = False
+        categorized = []
+        while True:
+            try:
+                kind, data = self.categorization_worker.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "error":
+                messagebox.showerror("Feil", f"Kategorisering feilet: {data}")
+            elif kind == "finished":
+                finished = True
+            elif kind == "started":
+                self.update_categorize_progress(data)
+            else:
+                transaction_id, category, remaining = data
+                if kind == "categorized":
+                    categorized.append(transaction_id)
+                self.categorization_processed += 1
+                self.update_categorize_progress(remaining)
+
+        if categorized:
+            # The worker writes through its own connection and posts its events after the commit, so notify
+            # from here: the listeners patch the changed rows (the list, the column cache) and the views update
+            self.db.notify("updated", categorized)
+
+        if finished:
+            self.categorization_worker.join()  # It posts "finished" as its last step
+            self.app.cancel_categorize_button.config(state=tk.DISABLED)
+            self.app.categorize_progress_label.config(text=f"Ferdig: {self.categorization_processed} behandlet")
+            # Jobs queued while the worker was cancelling or past its last claim need a new worker
+            cancelled = self.categorization_worker.stop_event.is_set()
+            if self.restart_categorization or (not cancelled and self.db.count_categorization_jobs('pending')):
+                self.start_categorization_worker()
+        else:
+            self.app.root.after(100, self.poll_categorization_worker)
+
+    def update_categorize_progress(self, remaining):
+        total = self.categorization_processed + remaining
+        self.app.categorize_progress['maximum'] = max(total, 1)
+        self.app.categorize_progress['value'] = self.categorization_processed
+        eta = ""
+        if self.categorization_processed:
+            seconds = (time.monotonic() - self.categorization_started) / self.categorization_processed * remaining
+            eta = f", ca. {int(seconds // 60)}:{int(seconds % 60):02d} igjen"
+        self.app.categorize_progress_label.config(text=f"{self.categorization_processed}/{total}{eta}")
+
     def filter_transactions(self):
-        filter_type = self.app.filter_var.get()
+        # Filtering, sorting and paging run in SQL; the list only fetches the rows it shows
+        if self.search_job is not None:
+            self.app.root.after_cancel(self.search_job)
+            self.search_job = None
+        self.loaded_filters = self.current_filters()
+        self.app.current_page = 1
+        self.update_treeview()
+
+    def on_search_changed(self, *args):
+        # Search as you type, but only once typing pauses; a newer keystroke supersedes the pending search
+        if self.search_job is not None:
+            self.app.root.after_cancel(self.search_job)
+        self.search_job = self.app.root.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        if self.current_filters() != self.loaded_filters:
+            self.filter_transactions()
+
+    def current_filters(self):
+        """Return the filter state of the transactions tab as keyword arguments for Database.filter_transactions."""
         from_date = self.app.from_entry.get_date()
         to_date = self.app.to_entry.get_date()
-        search_query = self.app.search_var.get().strip().lower()
 
+        # Set default filter to all transactions for the current year if no dates are selected
         if not from_date or not to_date:
             current_year = datetime.now().year
             from_date = datetime(current_year, 1, 1)
             to_date = datetime(current_year, 12, 31)
 
-        transactions = self.db.fetch_all_transactions(self.app.current_account_id)
-
-        if search_query:
-            transactions = self.apply_search_filter(transactions, search_query)
+        return {
+            "account_id": self.app.current_account_id,
+            "search": self.app.search_var.get(),
+            "from_date": from_date,
+            "to_date": to_date,
+            "direction": self.app.filter_var.get(),
+        }
 
-        transactions = self.apply_date_filter(transactions, from_date, to_date)
-        transactions = self.apply_type_filter(transactions, filter_type)
-
-        self.app.all_transactions = transactions
-        self.app.current_page = 1
-        self.update_treeview()
-
-    def apply_search_filter(self, transactions, search_query):
-        if search_query.startswith("kat:"):
-            return [t for t in transactions if search_query[4:] in t[5].lower()]
-        else:
-            return [t for t in transactions if search_query in t[2].lower()]
-
-    def apply_date_filter(self, transactions, from_date, to_date):
-        return [t for t in transactions if from_date <= datetime.strptime(t[1], "%d.%m.%Y").date() <= to_date]
-
-    def apply_type_filter(self, transactions, filter_type):
-        if filter_type != "Alle":
-            return [t for t in transactions if t[4] == filter_type]
-        return transactions
+    def on_transactions_changed(self, kind, transaction_ids):
+        # The list reads its rows from SQL, so refetching the rows in view is enough
+        if kind == "deleted":
+            self.app.transaction_list.deselect(set(transaction_ids))
+        self.update_treeview(keep_position=True)
 
     def display_transactions(self):
-        transactions = self.db.fetch_all_transactions(self.app.current_account_id)
-        transactions.sort(key=lambda x: x[1], reverse=True)
-        self.app.all_transactions = transactions
-        self.app.current_page = 1
-        self.update_treeview()
-
-    def update_treeview(self):
-        self.clear_treeview()
-        paginated_transactions = self.get_paginated_transactions()
-        self.populate_treeview(paginated_transactions)
+        # Sorted in SQL, by date (newest first) unless a column header was clicked
+        self.filter_transactions()
+
+    def update_treeview(self, keep_position=False):
+        filters = self.loaded_filters or self.current_filters()
+        self.result_count = self.db.count_transactions(**filters)
+        if keep_position and self.app.page_size and self.app.current_page > 1 and (self.app.current_page - 1) * self.app.page_size >= self.result_count:
+            self.app.current_page = max(1, -(-self.result_count // self.app.page_size))
+        start_index, row_count = self.get_page_bounds()
+        order = {"order_by": self.sort_column, "descending": self.sort_descending}
+        # Each block the list asks for is one LIMIT/OFFSET query, cached until the data changes
+        fetch_rows = lambda offset, limit: self.db.filter_transactions(limit=max(0, min(limit, row_count - offset)), offset=start_index + offset, **order, **filters)
+        fetch_ids = lambda: self.db.fetch_transaction_ids(limit=row_count, offset=start_index, **order, **filters)
+        if keep_position:
+            self.app.transaction_list.refresh(row_count, fetch_rows, fetch_ids)
+        else:
+            self.app.transaction_list.set_source(row_count, fetch_rows, fetch_ids)
         self.update_pagination_controls()
         self.update_status_line()
 
-    def clear_treeview(self):
-        for row in self.app.tree.get_children():
-            self.app.tree.delete(row)
-
-    def get_paginated_transactions(self):
+    def get_page_bounds(self):
+        if self.app.page_size is None:
+            return 0, self.result_count
         start_index = (self.app.current_page - 1) * self.app.page_size
-        end_index = start_index + self.app.page_size
-        return self.app.all_transactions[start_index:end_index]
-
-    def populate_treeview(self, transactions):
-        for row in transactions:
-            amount = self.format_amount(row[3])
-            self.app.tree.insert("", "end", values=(row[0], row[1], row[2], amount, row[4], row[5]), iid=str(row[0]))
+        return start_index, max(0, min(self.app.page_size, self.result_count - start_index))
 
-    def format_amount(self, amount):
-        try:
-            return f"{float(amount):.2f}"
-        except ValueError:
-            return amount
+    def format_transaction_row(self, row):
+        return (row.id, row.date_text(), row.description, f"{row.amount:.2f}", row.direction, row.category)
 
     def update_pagination_controls(self):
+        start_index, row_count = self.get_page_bounds()
         self.app.page_label.config(text=f"Side {self.app.current_page}")
         self.app.prev_button.config(state=tk.NORMAL if self.app.current_page > 1 else tk.DISABLED)
-        self.app.next_button.config(state=tk.NORMAL if self.app.current_page * self.app.page_size < len(self.app.all_transactions) else tk.DISABLED)
+        self.app.next_button.config(state=tk.NORMAL if start_index + row_count < self.result_count else tk.DISABLED)
 
     def update_status_line(self):
-        total_income = sum(float(t[3]) for t in self.app.all_transactions if t[4] == "Inntekt")
-        total_expenses = sum(float(t[3]) for t in self.app.all_transactions if t[4] == "Utgift")
-        transaction_count = len(self.app.all_transactions)
+        # Totals come from SQL for the loaded filters and are cached until the filters or data change
+        transaction_count, total_income, total_expenses = self.db.summarize_transactions(**(self.loaded_filters or self.current_filters()))
         self.app.status_label.config(text=f"Status: {transaction_count} transaksjoner, Inntekt: {total_income:.2f}, Utgifter: {total_expenses:.2f}")
 
     def prev_page(self):
@@ -150,35 +245,39 @@ class EventHandler:
             self.update_treeview()
 
     def next_page(self):
-        if (self.app.current_page * self.app.page_size) < len(self.app.all_transactions):
+        if self.app.page_size and (self.app.current_page * self.app.page_size) < self.result_count:
             self.app.current_page += 1
             self.update_treeview()
 
     def sort_treeview(self, col, reverse):
-        data = [(self.app.tree.set(child, col), child) for child in self.app.tree.get_children('')]
-        data.sort(reverse=reverse, key=lambda x: x[0])
-        for index, (val, child) in enumerate(data):
-            self.app.tree.move(child, '', index)
+        self.sort_column = col
+        self.sort_descending = reverse
+        for column in SORT_COLUMNS:
+            arrow = (" ▼" if reverse else " ▲") if column == col else ""
+            self.app.tree.heading(column, text=column + arrow)
+        # Same filters, new order: the count is cached, so a click costs one indexed LIMIT query for the first page
+        self.app.current_page = 1
+        self.update_treeview()
         self.app.tree.heading(col, command=lambda: self.sort_treeview(col, not reverse))
 
     def delete_transaction(self):
-        selected_item = self.app.tree.selection()
-        if selected_item:
-            transaction_id = self.app.tree.item(selected_item, 'values')[0]
-            self.db.delete_transaction(transaction_id)
-            self.display_transactions()
+        transaction_ids = self.app.transaction_list.selected_ids()
+        if transaction_ids:
+            if len(transaction_ids) > 1 and not messagebox.askyesno("Slett", f"Slette {len(transaction_ids)} transaksjoner?"):
+                return
+            self.db.delete_transactions(transaction_ids)
         else:
             messagebox.showwarning("Advarsel", "Velg en transaksjon å slette.")
 
     def edit_transaction(self, event):
-        selected_item = self.app.tree.selection()
-        if selected_item:
-            values = self.app.tree.item(selected_item, 'values')
-            transaction_id = values[0]
-            new_category = simpledialog.askstring("Rediger", "Oppdater kategori:", initialvalue=values[5])
+        transaction_ids = self.app.transaction_list.selected_ids()
+        if transaction_ids:
+            transaction_id = transaction_ids[0]
+            transaction = self.app.transaction_list.get_row(transaction_id) or self.db.fetch_transaction_by_id(transaction_id)
+            new_category = simpledialog.askstring("Rediger", "Oppdater kategori:", initialvalue=transaction.category)
             if new_category is not None:
+                metrics.record_user_edits(self.db.fetch_assigned_categories([transaction_id]), new_category)
                 self.db.update_category(transaction_id, new_category)
-                self.display_transactions()
         else:
             messagebox.showwarning("Advarsel", "Velg en transaksjon å redigere.")
 
@@ -187,13 +286,12 @@ class EventHandler:
             messagebox.showwarning("Advarsel", "Velg en konto først.")
             return
 
-        account = self.db.fetch_all_accounts()[self.app.current_account_id - 1]
+        account = self.db.account_registry.get(self.app.current_account_id)
         account_dialog = simpledialog.askstring("Rediger Konto", "Navn:", initialvalue=account[1])
         if account_dialog is not None:
             account_number = simpledialog.askstring("Rediger Konto", "Kontonummer:", initialvalue=account[2])
             notes = simpledialog.askstring("Rediger Konto", "Notater:", initialvalue=account[3])
             self.db.update_account(self.app.current_account_id, account_dialog, account_number, notes)
-            self.load_accounts()
 
     def analyze_transactions(self):
         from_date = self.app.from_entry.get_date()
@@ -202,57 +300,124 @@ class EventHandler:
             messagebox.showwarning("Advarsel", "Velg en gyldig dato-periode.")
             return
 
-        transactions = self.db.fetch_all_transactions(self.app.current_account_id)
-        transactions = [t for t in transactions if from_date <= datetime.strptime(t[1], "%d.%m.%Y").date() <= to_date]
+        self.loaded_filters = {"account_id": self.app.current_account_id, "search": "", "from_date": from_date, "to_date": to_date, "direction": None}
 
-        expense_summary = self.calculate_expense_summary(transactions)
-        total_expenses = sum(expense_summary.values())
+        analysis = reports.spending_analysis(self.db, self.app.current_account_id, from_date, to_date)
+        expense_summary = analysis["expenses"]
+        total_expenses = analysis["total"]
 
-        self.app.all_transactions = transactions
         self.app.current_page = 1
         self.update_treeview()
 
         self.show_analysis_report(expense_summary, total_expenses, from_date, to_date)
 
-    def calculate_expense_summary(self, transactions):
-        expense_summary = {}
-        for transaction in transactions:
-            if transaction[4] == "Utgift":
-                amount = self.get_transaction_amount(transaction)
-                if transaction[5] in expense_summary:
-                    expense_summary[transaction[5]] += amount
-                else:
-                    expense_summary[transaction[5]] = amount
-        return expense_summary
-
-    def get_transaction_amount(self, transaction):
-        try:
-            return float(transaction[3])
-        except ValueError:
-            return 0
-
     def show_analysis_report(self, expense_summary, total_expenses, from_date, to_date):
         report_window = tk.Toplevel(self.app.root)
         report_window.title(f"Forbruksanalyse ({from_date.strftime('%d.%m.%Y')} - {to_date.strftime('%d.%m.%Y')})")
 
         report_tree = ttk.Treeview(report_window, columns=("Kategori", "Beløp"), show="headings")
-        report_tree.heading("Kategori", text="Kategori")
-        report_tree.heading("Beløp", text="Beløp")
+        report_tree.heading("Kategori", text="Kategori", command=lambda: self.sort_analysis_treeview(report_tree, "Beløp", False))
+        report_tree.heading("Beløp", text="Beløp", command=lambda: self.sort_analysis_treeview(report_tree, "Beløp", False))
         report_tree.pack(pady=10, padx=10)
 
         for category, amount in expense_summary.items():
+            # Format the amount as currency with two decimal places
             formatted_amount = f"{amount:.2f}"
             report_tree.insert("", "end", values=(category, formatted_amount))
 
+        # Add a "TOTAL" row
         report_tree.insert("", "end", values=("TOTAL", f"{total_expenses:.2f}"))
 
         close_button = tk.Button(report_window, text="Lukk", command=report_window.destroy)
         close_button.pack(pady=5)
 
+    def sort_analysis_treeview(self, treeview, col, reverse):
+        # Get the data as a list of tuples
+        data = [(treeview.set(child, col), child) for child in treeview.get_children('')]
+
+        # Sort the data
+        if col == "Beløp":
+            # Convert the amount to float for sorting
+            data.sort(reverse=reverse, key=lambda x: float(x[0].replace(",", ".")))
+        else:
+            # Default sorting for other columns
+            data.sort(reverse=reverse, key=lambda x: x[0])
+
+        # Rearrange the items in the Treeview
+        for index, (val, child) in enumerate(data):
+            treeview.move(child, '', index)
+
+        # Reverse the sorting order for the next click
+        treeview.heading(col, command=lambda: self.sort_analysis_treeview(treeview, col, not reverse))
+
+    def show_categorization_metrics(self):
+        report_window = tk.Toplevel(self.app.root)
+        report_window.title("Kategoriseringsstatistikk")
+
+        report_text = tk.Text(report_window, width=90, height=20)
+        report_text.insert("1.0", metrics.report(self.db))
+        report_text.config(state=tk.DISABLED)
+        report_text.pack(pady=10, padx=10)
+
+        button_frame = tk.Frame(report_window)
+        button_frame.pack(pady=5)
+
+        save_button = tk.Button(button_frame, text="Lagre JSON", command=self.save_categorization_metrics)
+        save_button.pack(side='left', padx=5)
+
+        close_button = tk.Button(button_frame, text="Lukk", command=report_window.destroy)
+        close_button.pack(side='left', padx=5)
+
+    def save_categorization_metrics(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        if path:
+            metrics.dump_json(path, self.db)
+
+    def export_transactions(self):
+        """Export the transactions matching the current filters in the background, so the window stays responsive."""
+        if self.export_worker and self.export_worker.is_alive():
+            messagebox.showinfo("Eksport", "En eksport pågår allerede.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("Parquet files", "*.parquet")])
+        if not path:
+            return
+        from exporter import ExportWorker
+        self.export_worker = ExportWorker(self.db.db_name, path, self.loaded_filters or self.current_filters())
+        self.export_worker.start()
+        # The export button cancels the export while it runs
+        self.app.export_button.config(text="Avbryt eksport", command=self.cancel_export)
+        self.app.root.after(100, self.poll_export_worker)
+
+    def cancel_export(self):
+        if self.export_worker:
+            # The worker stops after the current batch and removes the unfinished file
+            self.export_worker.stop()
+            self.app.export_button.config(state=tk.DISABLED)
+            self.app.status_label.config(text="Avbryter eksport...")
+
+    def poll_export_worker(self):
+        while True:
+            try:
+                kind, data = self.export_worker.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                written, total = data
+                self.app.status_label.config(text=f"Eksporterer: {written}/{total} transaksjoner")
+            elif kind == "error":
+                messagebox.showerror("Feil", f"Eksport feilet: {data}")
+            elif kind == "finished":
+                self.app.export_button.config(text="Eksporter", command=self.export_transactions, state=tk.NORMAL)
+                self.update_status_line()
+                if data is not None:
+                    messagebox.showinfo("Eksport", f"{data} transaksjoner eksportert til {self.export_worker.path}")
+                return
+        self.app.root.after(100, self.poll_export_worker)
+
     def on_row_select(self, event):
         selected_rows = self.app.row_var.get()
         if selected_rows == "All":
-            self.app.page_size = len(self.app.all_transactions)
+            self.app.page_size = None  # Scroll through all rows in the virtual list
         else:
             self.app.page_size = int(selected_rows)
         self.app.current_page = 1
@@ -270,19 +435,18 @@ class EventHandler:
             self.app.context_menu.grab_release()
 
     def add_category_to_selected(self):
-        selected_items = self.app.tree.selection()
-        if selected_items:
+        transaction_ids = self.app.transaction_list.selected_ids()
+        if transaction_ids:
             new_category = simpledialog.askstring("Legg til Kategori", "Kategori:")
             if new_category:
-                for item in selected_items:
-                    transaction_id = self.app.tree.item(item, 'values')[0]
-                    self.db.update_category(transaction_id, new_category)
-                self.display_transactions()
+                metrics.record_user_edits(self.db.fetch_assigned_categories(transaction_ids), new_category)
+                self.db.bulk_update_categories(transaction_ids, new_category)
         else:
             messagebox.showwarning("Advarsel", "Velg minst en transaksjon.")
 
     def select_all_rows(self, event):
-        self.app.tree.selection_set(self.app.tree.get_children())
+        # Selects every row in the current view, including rows scrolled out of sight
+        self.app.transaction_list.select_all()
 
     def set_default_dates(self):
         default_from_date = datetime(datetime.now().year, 1, 1)
@@ -0,0 +1,166 @@
+"""
+Export transactions to CSV, XLSX or Parquet.
+
+Rows are streamed from the database in batches (Database.iter_transaction_batches)
+and written as they arrive, so memory use doesn't grow with the size of the export.
+The GUI runs exports in an ExportWorker thread; the same code is available from the
+command line:
+
+    python exporter.py utdrag.csv --account 1 --from 01.01.2024 --to 31.12.2024
+    python exporter.py alt.parquet --search kat:dagligvarer --direction Utgift
+
+openpyxl (XLSX) and pyarrow (Parquet) are optional and only imported when used.
+"""
+import argparse
+import csv
+import os
+import queue
+import sys
+import threading
+from database import Database, STREAM_BATCH_SIZE, date_argument
+
+COLUMNS = ["ID", "Dato", "Beskrivelse", "Beløp", "Retning", "Kategori"]
+XLSX_MAX_ROWS = 1048575  # Excel's row limit, minus the header
+
+def export_format(path):
+    """Return "csv", "xlsx" or "parquet" from the file extension."""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension not in WRITERS:
+        raise ValueError(f"Ukjent filformat: .{extension} (bruk .csv, .xlsx eller .parquet)")
+    return extension
+
+def write_csv(path, batches):
+    """Write a semicolon-separated CSV with dd.mm.yyyy dates and decimal commas, which Norwegian Excel opens as-is."""
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(COLUMNS)
+        for batch in batches:
+            writer.writerows((t.id, t.date_text(), t.description, f"{t.amount:.2f}".replace(".", ","), t.direction, t.category) for t in batch)
+            yield len(batch)
+
+def write_xlsx(path, batches):
+    """Write an XLSX workbook in openpyxl's write-only mode, which streams rows to disk instead of building the sheet in memory."""
+    from openpyxl import Workbook  # Optional, and slow to import
+    from openpyxl.cell import WriteOnlyCell
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transaksjoner")
+    sheet.append(COLUMNS)
+    for batch in batches:
+        for t in batch:
+            date_cell = WriteOnlyCell(sheet, t.date)
+            date_cell.number_format = "DD.MM.YYYY"
+            sheet.append([t.id, date_cell, t.description, t.amount, t.direction, t.category])
+        yield len(batch)
+    workbook.save(path)
+
+def write_parquet(path, batches):
+    """Write a Parquet file with pyarrow, one record batch per database batch."""
+    import pyarrow as pa  # Optional
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("ID", pa.int64()),
+        ("Dato", pa.date32()),
+        ("Beskrivelse", pa.string()),
+        ("Beløp", pa.float64()),
+        ("Retning", pa.string()),
+        ("Kategori", pa.string()),
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            # Transactions are tuples, so zip(*batch) turns the rows into columns
+            columns = list(zip(*batch))
+            writer.write_batch(pa.RecordBatch.from_arrays([pa.array(column, field.type) for column, field in zip(columns, schema)], schema=schema))
+            yield len(batch)
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "parquet": write_parquet}
+
+def export_transactions(db, path, file_format=None, progress=None, stop_event=None, batch_size=STREAM_BATCH_SIZE, **filters):
+    """
+    Export the transactions matching the filters, oldest first.
+
+    :param db: A Database.
+    :param file_format: "csv", "xlsx" or "parquet"; by default taken from the file extension.
+    :param progress: Called with (rows written, total rows) after each batch.
+    :param stop_event: A threading.Event; when set, the export stops and the partial file is removed.
+    :param filters: Keyword arguments for build_transaction_filter (account_id, search, from_date, ...).
+    :return: The number of rows written, or None if the export was stopped.
+    """
+    file_format = file_format or export_format(path)
+    total = db.count_transactions(**filters)
+    if file_format == "xlsx" and total > XLSX_MAX_ROWS:
+        raise ValueError(f"Et XLSX-ark har plass til maks {XLSX_MAX_ROWS} rader; bruk CSV eller Parquet for {total} rader")
+    written = 0
+    if progress:
+        progress(written, total)
+    batches = db.iter_transaction_batches(order_by="Dato", batch_size=batch_size, **filters)
+    try:
+        for count in WRITERS[file_format](path, batches):
+            written += count
+            if progress:
+                progress(written, total)
+            if stop_event is not None and stop_event.is_set():
+                break
+    finally:
+        batches.close()
+    if stop_event is not None and stop_event.is_set():
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    return written
+
+class ExportWorker(threading.Thread):
+    """
+    Runs export_transactions in a background thread with its own database connection,
+    like CategorizationWorker. Posts ("progress", (written, total)), ("error", message)
+    and finally ("finished", rows written or None if stopped) to `events`, which the GUI
+    polls with root.after.
+    """
+    def __init__(self, db_name, path, filters):
+        super().__init__(daemon=True)
+        self.db_name = db_name
+        self.path = path
+        self.filters = filters
+        self.events = queue.Queue()
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        written = None
+        db = None
+        try:
+            db = Database(self.db_name)
+            written = export_transactions(db, self.path, progress=lambda done, total: self.events.put(("progress", (done, total))),
+                                          stop_event=self.stop_event, **self.filters)
+        except Exception as e:
+            self.events.put(("error", str(e)))
+        finally:
+            if db is not None:
+                db.conn.close()
+        self.events.put(("finished", written))
+
+def main():
+    parser = argparse.ArgumentParser(description="Export transactions to CSV, XLSX or Parquet.")
+    parser.add_argument("path", help="Output file; the format is taken from the extension (.csv, .xlsx or .parquet)")
+    parser.add_argument("--db", default="transactions.db")
+    parser.add_argument("--account", type=int, help="Account ID; all accounts by default")
+    parser.add_argument("--search", help='Text in the description, or "kat:" followed by a category')
+    parser.add_argument("--from", dest="from_date", type=date_argument, help="First date, dd.mm.yyyy")
+    parser.add_argument("--to", dest="to_date", type=date_argument, help="Last date, dd.mm.yyyy")
+    parser.add_argument("--direction", choices=["Inntekt", "Utgift"])
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.DEBUG)  # The database logs every query
+
+    def progress(written, total):
+        print(f"\r{written}/{total}", end="", file=sys.stderr, flush=True)
+
+    written = export_transactions(Database(args.db), args.path, progress=progress, account_id=args.account, search=args.search,
+                                  from_date=args.from_date, to_date=args.to_date, direction=args.direction)
+    print(file=sys.stderr)
+    print(f"Wrote {written} transactions to {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+A local stand-in for the categorization agent, for load-testing the categorization
+pipeline offline. It speaks the JSON protocol of categorizer.HttpBackend.
+
+    python fake_categorizer_server.py --port 8765 --latency 0.2 --error-rate 0.05
+    PENGESJEKK_BACKENDS=rules,cache,http PENGESJEKK_CATEGORIZER_URL=http://127.0.0.1:8765/ python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keyword -> category, roughly what the real agent answers for common Norwegian merchants
+KEYWORDS = [
+    ("lønn", "Lønn"),
+    ("rema", "Dagligvarer"),
+    ("kiwi", "Dagligvarer"),
+    ("coop", "Dagligvarer"),
+    ("meny", "Dagligvarer"),
+    ("circle k", "Drivstoff"),
+    ("esso", "Drivstoff"),
+    ("ruter", "Transport"),
+    ("vy ", "Transport"),
+    ("husleie", "Bolig"),
+    ("strøm", "Strøm"),
+    ("telenor", "Telefon og internett"),
+    ("telia", "Telefon og internett"),
+    ("netflix", "Abonnementer"),
+    ("spotify", "Abonnementer"),
+    ("apotek", "Helse"),
+    ("vipps", "Overføringer"),
+]
+
+def guess_category(description, direction):
+    description = description.lower()
+    for keyword, category in KEYWORDS:
+        if keyword in description:
+            return category
+    return "Annen inntekt" if direction == "Inntekt" else "Diverse"
+
+class FakeCategorizerHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error(400, "Invalid JSON")
+            return
+
+        time.sleep(self.server.latency + random.uniform(0, self.server.jitter))
+        if random.random() < self.server.error_rate:
+            self.send_error(503, "Injected error")
+            return
+
+        description = str(body.get("description", ""))
+        prompt_tokens = len(description.split()) + 2
+        payload = json.dumps({
+            "category": guess_category(description, body.get("direction")),
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 2, "total_tokens": prompt_tokens + 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep load tests quiet
+
+def start_server(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+    """
+    Start the fake server on a background thread.
+
+    :param port: Port to listen on; 0 picks a free port.
+    :param latency: Fixed delay per request, in seconds.
+    :param jitter: Extra random delay per request, up to this many seconds.
+    :param error_rate: Share of requests answered with HTTP 503.
+    :return: The server. Its URL is f"http://{host}:{server.server_port}/"; stop it with shutdown().
+    """
+    server = ThreadingHTTPServer((host, port), FakeCategorizerHandler)
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the categorization agent.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed delay per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay per request in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503")
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Fake categorizer listening on http://{args.host}:{server.server_port}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import tkinter as tk
 from sys import argv
+import profiling
 if len(argv)>1:
     if argv[1]=="dev":
         from gui_new import TransactionApp
@@ -7,9 +8,13 @@ else:
     from gui import TransactionApp
 
 def main():
+    # PENGESJEKK_PROFILE=<dir> profiles every UI action; it must be enabled before the widgets are built
+    profiler = profiling.enable_from_environment()
     root = tk.Tk()
     app = TransactionApp(root)
     root.mainloop()
+    if profiler is not None:
+        profiler.write_summary()
 
 if __name__ == "__main__":
     main()
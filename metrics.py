@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+# Source of categories assigned before the answering backend was recorded
+UNKNOWN_SOURCE = "unknown"
+
+class CategorizationMetrics:
+    """
+    Collects telemetry for categorization calls: latency histograms, token usage,
+    which source answered (agent, rules, cache, ...) and how often users override
+    the category each source assigned. Safe to update from the categorization worker thread.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.calls = {}  # source -> number of answered calls
+            self.misses = {}  # source -> number of calls without an answer
+            self.errors = {}  # source -> number of failed calls
+            self.latency_histograms = {}  # source -> bucket counts
+            self.latency_totals = {}  # source -> summed latency in seconds
+            self.tokens = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            self.corrections = 0  # Agent answers rewritten by the income rule
+            self.reviewed = {}  # source -> user edits of categories that source assigned
+            self.overrides = {}  # source -> ... where the user picked a different category
+
+    def record_call(self, source, latency, usage=None, error=None, hit=True):
+        """
+        Record one categorization call.
+
+        :param source: Where the answer came from, e.g. "agent".
+        :param latency: Wall-clock time of the call in seconds.
+        :param usage: The usage object from the API response, if any.
+        :param error: The exception if the call failed.
+        :param hit: False if the source was asked but had no answer, e.g. a cache miss.
+        """
+        with self.lock:
+            if error is not None:
+                self.errors[source] = self.errors.get(source, 0) + 1
+            elif not hit:
+                self.misses[source] = self.misses.get(source, 0) + 1
+            else:
+                self.calls[source] = self.calls.get(source, 0) + 1
+            histogram = self.latency_histograms.setdefault(source, [0] * (len(LATENCY_BUCKETS) + 1))
+            histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+            self.latency_totals[source] = self.latency_totals.get(source, 0.0) + latency
+            if usage is not None:
+                for key in self.tokens:
+                    self.tokens[key] += getattr(usage, key, 0) or 0
+
+    def record_correction(self):
+        with self.lock:
+            self.corrections += 1
+
+    def record_user_edits(self, assigned_categories, new_category):
+        """
+        Record that the user set `new_category` on automatically categorized transactions.
+
+        :param assigned_categories: Dict mapping transaction ID to (source, category), as returned by
+                                    Database.fetch_assigned_categories.
+        """
+        with self.lock:
+            for source, assigned_category in assigned_categories.values():
+                source = source or UNKNOWN_SOURCE
+                self.reviewed[source] = self.reviewed.get(source, 0) + 1
+                if assigned_category != new_category:
+                    self.overrides[source] = self.overrides.get(source, 0) + 1
+
+    def snapshot(self, db=None):
+        """
+        Return the metrics as a JSON-serializable dict.
+
+        :param db: If given, the all-time override rate and the query cache statistics are included as well.
+        """
+        with self.lock:
+            total_calls = sum(self.calls.values())
+            sources = {}
+            for source in sorted(set(self.calls) | set(self.misses) | set(self.errors)):
+                calls = self.calls.get(source, 0)
+                misses = self.misses.get(source, 0)
+                errors = self.errors.get(source, 0)
+                consulted = calls + misses + errors
+                sources[source] = {
+                    "calls": calls,
+                    "misses": misses,
+                    "errors": errors,
+                    "hit_rate": calls / consulted if consulted else 0.0,
+                    "share": calls / total_calls if total_calls else 0.0,
+                    "mean_latency": self.latency_totals.get(source, 0.0) / consulted if consulted else 0.0,
+                    "latency_histogram": dict(zip([f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"],
+                                                  self.latency_histograms.get(source, []))),
+                }
+            data = {
+                "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "sources": sources,
+                "tokens": dict(self.tokens),
+                "income_corrections": self.corrections,
+                "session_overrides": {
+                    source: {
+                        "reviewed": reviewed,
+                        "overridden": self.overrides.get(source, 0),
+                        "override_rate": self.overrides.get(source, 0) / reviewed,
+                    }
+                    for source, reviewed in sorted(self.reviewed.items())
+                },
+            }
+        if db is not None:
+            data["overrides"] = {
+                source or UNKNOWN_SOURCE: {
+                    "categorized": categorized,
+                    "overridden": overridden,
+                    "override_rate": overridden / categorized if categorized else 0.0,
+                }
+                for source, (categorized, overridden) in sorted(db.fetch_override_stats().items(), key=lambda item: item[0] or "")
+            }
+            data["query_cache"] = db.query_cache.stats()
+        return data
+
+    def report(self, db=None):
+        data = self.snapshot(db)
+        lines = [f"Kategorisering siden {data['since']}"]
+        for source, stats in data["sources"].items():
+            lines.append(f"{source}: {stats['calls']} svar, {stats['misses']} bom, {stats['errors']} feil, "
+                         f"treffrate {stats['hit_rate']:.0%}, andel {stats['share']:.0%}, snittid {stats['mean_latency']:.2f}s")
+            lines.append("  " + ", ".join(f"{bucket}: {count}" for bucket, count in stats["latency_histogram"].items()))
+        tokens = data["tokens"]
+        lines.append(f"Tokens: {tokens['prompt_tokens']} inn, {tokens['completion_tokens']} ut, {tokens['total_tokens']} totalt")
+        lines.append(f"Korrigerte inntektskategorier: {data['income_corrections']}")
+        for source, session in data["session_overrides"].items():
+            lines.append(f"Overstyrt denne økten ({source}): {session['overridden']} av {session['reviewed']} ({session['override_rate']:.0%})")
+        for source, overrides in data.get("overrides", {}).items():
+            lines.append(f"Overstyrt totalt ({source}): {overrides['overridden']} av {overrides['categorized']} ({overrides['override_rate']:.0%})")
+        if "query_cache" in data:
+            cache = data["query_cache"]
+            lines.append(f"Spørringsbuffer: {cache['hits']} treff, {cache['misses']} bom, treffrate {cache['hit_rate']:.0%}, "
+                         f"{cache['entries']} resultater ({cache['rows']} rader), {cache['evictions']} kastet ut")
+            for name, stats in cache["queries"].items():
+                lines.append(f"  {name}: {stats['hits']} treff, {stats['misses']} bom ({stats['hit_rate']:.0%})")
+        return "\n".join(lines)
+
+    def dump_json(self, path, db=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(db), f, ensure_ascii=False, indent=2)
+
+# Shared instance used by the categorizer and the GUI
+metrics = CategorizationMetrics()
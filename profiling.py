@@ -0,0 +1,124 @@
+"""
+Opt-in profiling of UI actions.
+
+Every Tk callback (button commands, combobox selections, key and mouse bindings,
+variable traces and after() callbacks) goes through tkinter.CallWrapper. When
+profiling is enabled, that class is replaced with one that runs the callback under
+cProfile. Slow actions are saved as .prof files, and slowest_actions.txt lists the
+slowest actions among the recent ones. When profiling is off nothing is patched,
+so it costs nothing.
+
+    PENGESJEKK_PROFILE=profiles python main.py
+    python -m pstats profiles/0003_BudgetTab.generate_budget_812ms.prof
+
+Callbacks are only wrapped if they are registered after enable(), so enable it
+before the app builds its widgets.
+"""
+import cProfile
+import os
+import re
+import threading
+import time
+import tkinter
+from collections import deque
+
+MIN_MS = 50  # Actions faster than this are counted but not saved as .prof files
+RECENT_ACTIONS = 1000  # The summary covers this many of the latest actions
+SUMMARY_LINES = 20
+
+class ActionProfiler:
+    def __init__(self, directory, min_ms=MIN_MS):
+        self.directory = directory
+        self.min_seconds = min_ms / 1000
+        self.recent = deque(maxlen=RECENT_ACTIONS)  # (name, seconds, .prof path or None)
+        self.saved = 0
+        self.active = False  # True while an action runs; nested callbacks are part of it
+        os.makedirs(directory, exist_ok=True)
+
+    def run(self, name, func, *args):
+        if self.active or threading.current_thread() is not threading.main_thread():
+            return func(*args)
+        self.active = True
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            seconds = time.perf_counter() - start
+            self.active = False
+            self.record(name, seconds, profile)
+
+    def record(self, name, seconds, profile):
+        path = None
+        if seconds >= self.min_seconds:
+            self.saved += 1
+            slug = re.sub(r"[^\w.-]+", "_", name).strip("_")[:80]
+            path = os.path.join(self.directory, f"{self.saved:04d}_{slug}_{seconds * 1000:.0f}ms.prof")
+            profile.dump_stats(path)
+        self.recent.append((name, seconds, path))
+        if path:
+            self.write_summary()
+
+    def summary(self):
+        """Return the slowest recent actions as text, one line per action name."""
+        actions = {}
+        for name, seconds, path in self.recent:
+            calls, total, slowest, slowest_path = actions.get(name, (0, 0.0, 0.0, None))
+            if seconds >= slowest:
+                slowest, slowest_path = seconds, path or slowest_path
+            actions[name] = (calls + 1, total + seconds, slowest, slowest_path)
+        lines = [f"Tregeste handlinger (siste {len(self.recent)})"]
+        ranked = sorted(actions.items(), key=lambda item: item[1][2], reverse=True)
+        for name, (calls, total, slowest, path) in ranked[:SUMMARY_LINES]:
+            lines.append(f"{slowest * 1000:8.0f} ms maks {total / calls * 1000:8.1f} ms snitt {calls:5d}x  {name}"
+                         + (f"  ({os.path.basename(path)})" if path else ""))
+        return "\n".join(lines)
+
+    def write_summary(self):
+        with open(os.path.join(self.directory, "slowest_actions.txt"), "w", encoding="utf-8") as f:
+            f.write(self.summary() + "\n")
+
+def action_name(func, widget):
+    """Name a callback after the function it runs, plus the button text if it has one."""
+    # after() wraps the function in a local callit(); report the function it calls instead
+    if getattr(func, "__name__", "") == "callit" and func.__closure__:
+        inner = [cell.cell_contents for cell in func.__closure__ if callable(cell.cell_contents)]
+        if inner:
+            func = inner[0]
+    name = getattr(func, "__qualname__", None) or repr(func)
+    try:
+        text = widget.cget("text")
+    except (tkinter.TclError, AttributeError):
+        text = ""
+    return f"{name} [{text}]" if text else name
+
+profiler = None
+original_call_wrapper = tkinter.CallWrapper
+
+class ProfilingCallWrapper(original_call_wrapper):
+    def __call__(self, *args):
+        return profiler.run(action_name(self.func, self.widget), super().__call__, *args)
+
+def enable(directory="profiles", min_ms=MIN_MS):
+    """Profile every Tk callback registered from now on, saving results in `directory`."""
+    global profiler
+    profiler = ActionProfiler(directory, min_ms)
+    tkinter.CallWrapper = ProfilingCallWrapper
+    return profiler
+
+def disable():
+    """Stop wrapping new callbacks. Callbacks that are already wrapped keep being profiled."""
+    global profiler
+    tkinter.CallWrapper = original_call_wrapper
+    if profiler is not None:
+        profiler.write_summary()
+
+def enable_from_environment():
+    """
+    Enable profiling if PENGESJEKK_PROFILE is set; its value is the output directory ("1" means "profiles").
+    PENGESJEKK_PROFILE_MIN_MS sets the threshold for saving .prof files.
+    """
+    directory = os.environ.get("PENGESJEKK_PROFILE")
+    if not directory:
+        return None
+    return enable("profiles" if directory == "1" else directory, float(os.environ.get("PENGESJEKK_PROFILE_MIN_MS", MIN_MS)))
@@ -0,0 +1,66 @@
+"""
+Bounded LRU cache for the results of Database reads.
+
+Keys include a write generation (see Database.cache_generation), so a write makes
+the old entries unreachable instead of having to find and delete them; they are
+evicted as the least recently used. The cache holds at most `max_entries` results
+and `max_rows` rows in total, counting a list or dict result as one row per item.
+"""
+from collections import OrderedDict
+
+MISSING = object()
+
+class QueryCache:
+    def __init__(self, max_entries=128, max_rows=500000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = OrderedDict()  # key -> (result, rows), least recently used first
+        self.rows = 0
+        self.hits = {}  # query name -> count
+        self.misses = {}
+        self.evictions = 0
+
+    def get(self, name, key):
+        """Return the cached result, or MISSING. `name` is the query, used for the hit counts."""
+        entry = self.entries.get(key, MISSING)
+        if entry is MISSING:
+            self.misses[name] = self.misses.get(name, 0) + 1
+            return MISSING
+        self.entries.move_to_end(key)
+        self.hits[name] = self.hits.get(name, 0) + 1
+        return entry[0]
+
+    def put(self, key, result):
+        rows = len(result) if isinstance(result, (list, dict)) else 1
+        if rows > self.max_rows:
+            return  # Would push out everything else
+        if key in self.entries:
+            self.rows -= self.entries.pop(key)[1]
+        self.entries[key] = (result, rows)
+        self.rows += rows
+        while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+            self.rows -= self.entries.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.rows = 0
+
+    def stats(self):
+        """Return hit and miss counts, overall and per query, as a JSON-serializable dict."""
+        queries = {}
+        for name in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits.get(name, 0)
+            misses = self.misses.get(name, 0)
+            queries[name] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "rows": self.rows,
+            "evictions": self.evictions,
+            "queries": queries,
+        }
@@ -2,21 +2,23 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 from datetime import datetime
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
+from bar_chart import BarChart
+import reports
+from event_bus import IdleCoalescer, ACCOUNT_CHANGED, TRANSACTION_EVENTS
 
 class ReportingTab:
     def __init__(self, master, db):
         self.master = master
         self.db = db
+        self.account_ids = []  # Account IDs in the order of the account combobox
+        self.shown_report = None  # (search, account_id, from_date, to_date) of the plotted report
 
         # Create a frame for the reporting tab
         self.reporting_frame = ttk.Frame(master)
         self.reporting_frame.pack(fill='both', expand=True)
 
         # Search field
-        self.search_label = tk.Label(self.reporting_frame, text="Søk:")
+        self.search_label = tk.Label(self.reporting_frame, text="Søk (flere ord skilles med komma, kat: søker i kategori):")
         self.search_label.pack(pady=5)
 
         self.search_var = tk.StringVar()
@@ -50,77 +52,76 @@ class ReportingTab:
         self.from_entry.set_date(datetime(current_year, 1, 1))
         self.to_entry.set_date(datetime(current_year, 12, 31))
 
+        # Grouped or stacked bars when comparing several search terms
+        self.stacked_var = tk.BooleanVar(value=False)
+        self.stacked_check = tk.Checkbutton(self.reporting_frame, text="Stablet", variable=self.stacked_var, command=self.replot)
+        self.stacked_check.pack(pady=5)
+
         # Button to generate the report
         self.generate_button = tk.Button(self.reporting_frame, text="Generer rapport", command=self.generate_report)
         self.generate_button.pack(pady=10)
 
-        # Load accounts
+        # Load accounts, and again when accounts or transactions change
         self.load_accounts()
+        self.db.events.subscribe((ACCOUNT_CHANGED,) + TRANSACTION_EVENTS, IdleCoalescer(self.reporting_frame, self.on_data_changed))
 
         # Initialize the Matplotlib figure and canvas
         self.initialize_plot()
 
     def load_accounts(self):
-        accounts = self.db.fetch_all_accounts()
-        account_names = [f"{name} ({account_number})" for id, name, account_number, notes in accounts]
+        registry = self.db.account_registry
+        self.account_ids = registry.ids()  # Parallel to the combobox labels; the selected index gives the ID
+        account_names = registry.label_list()
         self.account_menu['values'] = account_names
-        if account_names:
+        if account_names and self.account_var.get() not in account_names:
             self.account_var.set(account_names[0])
 
-    def initialize_plot(self):
-        # Set global font properties
-        fm.FontProperties(family='DejaVu Sans', size=12)
+    def on_data_changed(self, changes):
+        """Update after a burst of database events; `changes` is {event: (transaction IDs, account IDs)}."""
+        if ACCOUNT_CHANGED in changes:
+            self.load_accounts()
+        changed_accounts = set()
+        for event in TRANSACTION_EVENTS:
+            if event in changes:
+                changed_accounts |= changes[event][1]
+        if self.shown_report and changed_accounts:
+            account_id = self.shown_report[1]
+            if account_id is None or account_id in changed_accounts:
+                self.replot()
+
+    def replot(self):
+        """Plot the shown report again, with fresh data and the current bar mode."""
+        if self.shown_report:
+            search_query, account_id, from_date, to_date = self.shown_report
+            self.plot_report(search_query, reports.search_report(self.db, search_query, account_id, from_date, to_date))
 
-        # Create a Matplotlib figure with a higher DPI for better readability
-        self.figure, self.ax = plt.subplots(dpi=120)  # Set DPI to 120 or adjust as needed
-        self.canvas = FigureCanvasTkAgg(self.figure, self.reporting_frame)
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+    def initialize_plot(self):
+        # One chart for the tab, updated in place by each report; a higher DPI for better readability
+        self.chart = BarChart(self.reporting_frame, xlabel='Måned', ylabel='Forbruk', color='skyblue', dpi=120, fontsize=10)
+        self.chart.widget.pack(fill='both', expand=True)
 
     def generate_report(self):
         search_query = self.search_var.get().strip().lower()
-        account = self.account_var.get()
+        account_index = self.account_menu.current()
         from_date = self.from_entry.get_date()
         to_date = self.to_entry.get_date()
 
-        if not search_query or not account or not from_date or not to_date:
+        if not search_query or account_index < 0 or not from_date or not to_date:
             messagebox.showwarning("Advarsel", "Vennligst fyll ut alle feltene.")
             return
 
-        account_name, account_number = account.split(" (")
-        account_number = account_number.rstrip(")")
-        account_id = self.db.get_account_id(account_name, account_number)
+        account_id = self.account_ids[account_index]
 
-        transactions = self.db.fetch_all_transactions(account_id)
-        filtered_transactions = []
+        months = reports.search_report(self.db, search_query, account_id, from_date, to_date)
 
-        for transaction in transactions:
-            date = datetime.strptime(transaction[1], "%d.%m.%Y").date()
-            if from_date <= date <= to_date and (search_query in transaction[2].lower() or search_query in transaction[5].lower()):
-                filtered_transactions.append(transaction)
-
-        if not filtered_transactions:
+        if not months:
             messagebox.showinfo("Ingen data", "Ingen transaksjoner funnet for søket.")
             return
-
-        # Prepare data for plotting
-        months = {}
-        for transaction in filtered_transactions:
-            date = datetime.strptime(transaction[1], "%d.%m.%Y")
-            month_year = date.strftime("%Y-%m")
-            if month_year not in months:
-                months[month_year] = 0
-            months[month_year] += float(transaction[3])
-
-        # Clear the existing plot
-        self.ax.clear()
-
-        # Plot the data
-        self.ax.bar(months.keys(), months.values(), color='skyblue')
-        self.ax.set_xlabel('Måned', fontsize=12)
-        self.ax.set_ylabel('Forbruk', fontsize=12)
-        self.ax.set_title(f'Forbruk per måned for "{search_query}"', fontsize=14)
-        self.ax.tick_params(axis='x', rotation=45, labelsize=10)
-        self.ax.tick_params(axis='y', labelsize=10)
-
-        # Redraw the canvas
-        self.canvas.draw()
+        self.shown_report = (search_query, account_id, from_date, to_date)
+        self.plot_report(search_query, months)
+
+    def plot_report(self, search_query, months):
+        """Plot {"yyyy-mm": {term: total}} with one series per search term."""
+        terms = reports.split_terms(search_query)
+        series = {term: [totals[term] for totals in months.values()] for term in terms}
+        self.chart.update_series(list(months.keys()), series, title=f'Forbruk per måned for "{search_query}"', stacked=self.stacked_var.get())
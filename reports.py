@@ -0,0 +1,176 @@
+"""
+Reports as plain data, without a GUI: budget per category, spending analysis, monthly
+trend and the search report of the reporting tab. The tabs display these results, and
+the same reports can be printed from the command line, e.g. from cron:
+
+    python reports.py budget --from 01.01.2024 --to 31.12.2024 --account 1 --format json
+    python reports.py trend --direction Utgift --search kat:dagligvarer
+    python reports.py search --search "rema, kiwi, kat:restaurant"
+
+Results are memoized per database and arguments, and thrown away as soon as the data
+changes (Database.data_version), so repeating a report is free until something is
+imported, categorized or deleted. Don't modify the returned dicts; they are shared.
+"""
+import argparse
+import functools
+import inspect
+import json
+import weakref
+from datetime import date
+from database import Database, date_argument
+
+memos = weakref.WeakKeyDictionary()  # Database -> (data version, {(report, arguments): result})
+
+def memoized(report):
+    """Cache the results of `report(db, ...)` until the database's data version changes."""
+    signature = inspect.signature(report)
+
+    @functools.wraps(report)
+    def wrapper(db, *args, **kwargs):
+        version = db.data_version()
+        memo_version, results = memos.get(db, (None, None))
+        if memo_version != version:
+            results = {}
+            memos[db] = (version, results)
+        # Bind the arguments, so budget(db, 1) and budget(db, account_id=1) share a result
+        arguments = signature.bind(db, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (report.__name__,) + tuple(arguments.arguments.items())[1:]
+        if key not in results:
+            results[key] = report(db, *args, **kwargs)
+        return results[key]
+    return wrapper
+
+def account_columns(db, account_id):
+    """Return the NumPy columns for the account, or None if NumPy isn't installed."""
+    from columnar_cache import get_cache  # Imports NumPy, which is slow to load
+    column_cache = get_cache(db)
+    return column_cache.get(account_id) if column_cache is not None else None
+
+def month_keys(monthly):
+    """Turn {(year, month): total} into {"yyyy-mm": total}."""
+    return {f"{year}-{month:02d}": total for (year, month), total in monthly.items()}
+
+@memoized
+def budget(db, account_id=None, from_date=None, to_date=None):
+    """
+    Income and expenses per category in the period.
+
+    :param account_id: One account; None for all accounts.
+    :param from_date: First date to include (a date), or None for no lower limit.
+    :param to_date: Last date to include.
+    :return: {"income": {category: total}, "expenses": {category: total}, "total_income": float,
+             "total_expenses": float}. Expenses are negative.
+    """
+    columns = account_columns(db, account_id)
+    if columns is not None:
+        income = columns.category_totals(columns.mask(from_date, to_date, "Inntekt"))
+        expenses = columns.category_totals(columns.mask(from_date, to_date, "Utgift"))
+    else:
+        income = db.category_totals(account_id=account_id, from_date=from_date, to_date=to_date, direction="Inntekt")
+        expenses = db.category_totals(account_id=account_id, from_date=from_date, to_date=to_date, direction="Utgift")
+    return {"income": income, "expenses": expenses, "total_income": sum(income.values()), "total_expenses": sum(expenses.values())}
+
+@memoized
+def spending_analysis(db, account_id=None, from_date=None, to_date=None):
+    """
+    Expenses per category in the period, as shown by "Analyser Transaksjoner".
+
+    :return: {"expenses": {category: total}, "total": float}. Amounts are negative.
+    """
+    expenses = budget(db, account_id, from_date, to_date)["expenses"]
+    return {"expenses": expenses, "total": sum(expenses.values())}
+
+@memoized
+def monthly_trend(db, account_id=None, from_date=None, to_date=None, direction=None, search=None):
+    """
+    Net amount per month for the transactions matching the filters of the transactions tab.
+
+    :param direction: "Inntekt" or "Utgift"; None or "Alle" for both.
+    :param search: Text in the description, or in the category with a "kat:" prefix.
+    :return: {"yyyy-mm": total} in date order.
+    """
+    columns = account_columns(db, account_id)
+    if columns is not None:
+        return month_keys(columns.monthly_totals(columns.mask(from_date, to_date, direction, search)))
+    return month_keys(db.monthly_totals(account_id=account_id, from_date=from_date, to_date=to_date, direction=direction, search=search))
+
+def split_terms(search):
+    """Split comma-separated search text into lowercased terms, e.g. "Rema, kat:Mat" -> ("rema", "kat:mat")."""
+    terms = [term.strip().lower() for term in search.split(",")]
+    return tuple(dict.fromkeys(term for term in terms if term))
+
+@memoized
+def search_report(db, search, account_id=None, from_date=None, to_date=None):
+    """
+    Net amount per month for each comma-separated term in `search`, as plotted by the reporting tab.
+    A term matches the description or the category; with a "kat:" prefix only the category.
+    All terms are summed in one query (Database.monthly_totals_by_term).
+
+    :return: {"yyyy-mm": {term: total}} in date order; empty if nothing matched.
+    """
+    terms = split_terms(search)
+    monthly = db.monthly_totals_by_term(terms, account_id=account_id, from_date=from_date, to_date=to_date)
+    return {month: dict(zip(terms, totals)) for month, totals in month_keys(monthly).items()}
+
+def format_text(name, result):
+    """Format a report as aligned text for the terminal."""
+    lines = []
+    if name == "budget":
+        lines.append(f"{'Kategori':<30} {'Inntekt':>12} {'Utgift':>12}")
+        for category, amount in sorted(result["income"].items()):
+            lines.append(f"{category or '(ingen)':<30} {amount:12.2f} {'':>12}")
+        for category, amount in sorted(result["expenses"].items()):
+            lines.append(f"{category or '(ingen)':<30} {'':>12} {-amount:12.2f}")
+        lines.append(f"{'TOTAL':<30} {result['total_income']:12.2f} {-result['total_expenses']:12.2f}")
+    elif name == "spending":
+        for category, amount in sorted(result["expenses"].items(), key=lambda item: item[1]):
+            lines.append(f"{category or '(ingen)':<30} {amount:12.2f}")
+        lines.append(f"{'TOTAL':<30} {result['total']:12.2f}")
+    elif name == "search":
+        terms = list(next(iter(result.values()), {}))
+        lines.append(f"{'Måned':<8} " + " ".join(f"{term[:14]:>14}" for term in terms))
+        for month, totals in result.items():
+            lines.append(f"{month:<8} " + " ".join(f"{totals[term]:14.2f}" for term in terms))
+    else:
+        for month, amount in result.items():
+            lines.append(f"{month}  {amount:12.2f}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a report as JSON or text.")
+    parser.add_argument("report", choices=["budget", "spending", "trend", "search"])
+    parser.add_argument("--db", default="transactions.db")
+    parser.add_argument("--account", type=int, help="Account ID; all accounts by default")
+    parser.add_argument("--from", dest="from_date", type=date_argument, help="First date, dd.mm.yyyy; 1 January this year by default")
+    parser.add_argument("--to", dest="to_date", type=date_argument, help="Last date, dd.mm.yyyy; 31 December this year by default")
+    parser.add_argument("--direction", choices=["Inntekt", "Utgift"], help="trend only")
+    parser.add_argument("--search", help='Search text, "kat:" searches the category; for search, several terms separated by commas')
+    parser.add_argument("--format", choices=["json", "text"], default="text")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.DEBUG)  # The database logs every query
+
+    year = date.today().year
+    from_date = args.from_date or date(year, 1, 1)
+    to_date = args.to_date or date(year, 12, 31)
+    db = Database(args.db)
+    if args.report == "budget":
+        result = budget(db, args.account, from_date, to_date)
+    elif args.report == "spending":
+        result = spending_analysis(db, args.account, from_date, to_date)
+    elif args.report == "trend":
+        result = monthly_trend(db, args.account, from_date, to_date, args.direction, args.search)
+    else:
+        if not (args.search or "").strip():
+            parser.error("search needs --search")
+        result = search_report(db, args.search, args.account, from_date, to_date)
+
+    if args.format == "json":
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_text(args.report, result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure how long the app takes to start.
+
+Import cost comes from `python -X importtime`. Time to first paint is measured from
+launching a fresh interpreter until the main window has been drawn. Needs a display
+(or Xvfb) for the paint measurement.
+
+    python startup_benchmark.py                # gui.py, fails if first paint takes over 1.5 s
+    python startup_benchmark.py --module gui_new --target 2 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Run in a fresh interpreter: build the app, draw the window once and report back
+PAINT_SCRIPT = """
+import tkinter as tk
+from {module} import TransactionApp
+root = tk.Tk()
+app = TransactionApp(root)
+root.update_idletasks()  # Lay out and draw the window
+print("painted", flush=True)
+root.update()  # The window maps, which starts the deferred list load
+print("loaded", flush=True)
+root.destroy()
+"""
+
+def import_times(module, cwd=HERE):
+    """
+    Return the import times of `module` and everything it imports.
+
+    :return: A list of (cumulative_seconds, self_seconds, name), slowest first.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=cwd, capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.rstrip()))
+    return sorted(times, reverse=True)
+
+def time_to_first_paint(module, data_dir):
+    """
+    Start the app in a new interpreter and time it.
+
+    :param data_dir: Working directory for the app, i.e. where transactions.db is read from.
+    :return: A tuple (seconds until the window was drawn, seconds until the transaction list was loaded).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [HERE, os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", PAINT_SCRIPT.format(module=module)],
+                               cwd=data_dir, env=env, stdout=subprocess.PIPE, text=True)
+    marks = {}
+    for line in process.stdout:
+        marks[line.strip()] = time.perf_counter() - start
+    if process.wait() != 0 or "painted" not in marks:
+        raise RuntimeError(f"{module} failed to start (exit code {process.returncode})")
+    return marks["painted"], marks.get("loaded", marks["painted"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first paint.")
+    parser.add_argument("--module", default="gui", help="gui or gui_new")
+    parser.add_argument("--target", type=float, default=1.5, help="Maximum time to first paint in seconds")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    parser.add_argument("--data-dir", help="Directory with transactions.db; defaults to an empty temporary directory")
+    args = parser.parse_args()
+
+    times = import_times(args.module)
+    print(f"Import {args.module}: {times[0][0]:.3f}s")
+    for cumulative, own, name in times[1:args.top + 1]:
+        print(f"  {cumulative:7.3f}s (self {own:.3f}s) {name}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        painted, loaded = time_to_first_paint(args.module, args.data_dir or temp_dir)
+    print(f"Time to first paint: {painted:.3f}s (target {args.target:.2f}s)")
+    print(f"Transaction list loaded: {loaded:.3f}s")
+    if painted > args.target:
+        print("Startup is slower than the target")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
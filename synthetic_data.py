@@ -0,0 +1,207 @@
+"""
+Synthetic transactions for testing at scale: Eika-style XLSX exports, Sparebank1-style
+CSV exports, or rows seeded straight into the database. The same seed always gives
+the same data.
+
+    python synthetic_data.py eika eksport.xlsx --rows 10000
+    python synthetic_data.py sparebank1 eksport.csv --rows 100000 --seed 7
+    python synthetic_data.py db transactions.db --rows 1000000 --accounts 2
+"""
+import argparse
+import calendar
+import hashlib
+import math
+import random
+from datetime import date, timedelta
+
+# Merchant, category, relative frequency, typical amount in NOK
+MERCHANTS = [
+    ("REMA 1000", "Dagligvarer", 30, 280),
+    ("KIWI", "Dagligvarer", 25, 240),
+    ("COOP EXTRA", "Dagligvarer", 18, 320),
+    ("MENY", "Dagligvarer", 10, 450),
+    ("BUNNPRIS", "Dagligvarer", 6, 150),
+    ("CIRCLE K", "Drivstoff", 8, 650),
+    ("ESSO", "Drivstoff", 4, 600),
+    ("RUTER", "Transport", 9, 44),
+    ("VY", "Transport", 3, 350),
+    ("APOTEK 1", "Helse", 3, 190),
+    ("VINMONOPOLET", "Alkohol", 3, 400),
+    ("PEPPES PIZZA", "Restaurant", 3, 520),
+    ("STARBUCKS", "Restaurant", 5, 75),
+    ("XXL SPORT", "Klær og utstyr", 1, 900),
+    ("H&M", "Klær og utstyr", 2, 450),
+    ("CLAS OHLSON", "Hus og hjem", 2, 300),
+    ("IKEA", "Hus og hjem", 1, 1400),
+    ("ELKJØP", "Elektronikk", 1, 2200),
+    ("NORLI", "Fritid", 1, 250),
+    ("SATS", "Fritid", 1, 499),
+]
+PLACES = ["OSLO", "BERGEN", "TRONDHEIM", "STAVANGER", "TROMSØ", "DRAMMEN", "FREDRIKSTAD", "ÅLESUND", "BODØ", "GJØVIK"]
+VIPPS_NAMES = ["OLA NORDMANN", "KARI NORDMANN", "PER HANSEN", "ANNE JOHANSEN", "BJØRN OLSEN", "SIRI LARSEN"]
+
+# Description, category, day of month, amount (negative for expenses), amount varies by up to this share
+RECURRING = [
+    ("HUSLEIE BORETTSLAG", "Bolig", 1, -12500.0, 0),
+    ("NETFLIX.COM", "Abonnementer", 5, -179.0, 0),
+    ("SPOTIFY", "Abonnementer", 12, -129.0, 0),
+    ("FJORDKRAFT STRØM", "Strøm", 15, -1400.0, 0.6),
+    ("TELENOR NORGE AS", "Telefon og internett", 20, -549.0, 0),
+    ("LØNN ARBEIDSGIVER AS", "Lønn", 20, 42000.0, 0.05),
+    ("OVERFØRING TIL SPAREKONTO", "Sparing", 21, -3000.0, 0),
+]
+
+DUPLICATE_RATE = 0.005  # Rows exported twice, as happens with overlapping bank exports
+VIPPS_RATE = 0.04
+XLSX_MAX_ROWS = 1048575  # Excel's row limit, minus the header
+DEFAULT_END = date(2024, 12, 31)  # Fixed rather than today, so a seed gives the same rows on any day
+
+def generate_transactions(rows, seed=0, start=None, end=None, duplicate_rate=DUPLICATE_RATE, with_categories=False):
+    """
+    Yield `rows` transactions in date order, in the form upload_file passes to Database.insert_transactions.
+
+    Rows are spread evenly over the period, so large volumes give many transactions per day.
+    Rent, subscriptions, power, salary and savings transfers recur monthly; the rest are
+    card payments drawn from MERCHANTS and occasional Vipps transfers.
+
+    :param seed: Random seed; the same seed gives the same rows.
+    :param start: First date, by default 1 January two years ago.
+    :param end: Last date, by default DEFAULT_END.
+    :param duplicate_rate: Share of rows that repeat the previous row exactly.
+    :param with_categories: Fill in Kategori with the true category instead of leaving it empty.
+    """
+    rng = random.Random(seed)
+    end = end or DEFAULT_END
+    start = start or date(end.year - 2, 1, 1)
+    days = (end - start).days + 1
+    weights = [weight for _, _, weight, _ in MERCHANTS]
+    emitted = 0
+    previous = None
+
+    def transaction(day, description, amount, category):
+        return {
+            "Dato": day.strftime("%d.%m.%Y"),
+            "Beskrivelse": description,
+            "Beløp": amount,
+            "Retning": "Inntekt" if amount > 0 else "Utgift",
+            "Kategori": category if with_categories else "",
+        }
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        last_day = calendar.monthrange(day.year, day.month)[1]
+        for description, category, day_of_month, amount, variation in RECURRING:
+            if emitted < rows and day.day == min(day_of_month, last_day):
+                if variation:
+                    amount *= 1 + rng.uniform(-variation, variation)
+                previous = transaction(day, description, round(amount, 2), category)
+                emitted += 1
+                yield previous
+
+        target = rows * (offset + 1) // days
+        while emitted < target:
+            if previous is not None and rng.random() < duplicate_rate:
+                pass  # Repeat the previous row
+            elif rng.random() < VIPPS_RATE:
+                amount = round(rng.uniform(50, 1500), 0)
+                previous = transaction(day, f"VIPPS *{rng.choice(VIPPS_NAMES)}", amount if rng.random() < 0.4 else -amount, "Overføringer")
+            else:
+                merchant, category, _, typical = rng.choices(MERCHANTS, weights)[0]
+                amount = round(rng.lognormvariate(math.log(typical), 0.6), 2)
+                previous = transaction(day, f"{merchant} {rng.choice(PLACES)}", -amount, category)
+            emitted += 1
+            yield previous
+
+def format_amount(amount):
+    """Format an amount the Norwegian way, with a decimal comma."""
+    return f"{amount:.2f}".replace(".", ",")
+
+def write_sparebank1_csv(path, rows, seed=0, **options):
+    """
+    Write a Sparebank1-style CSV export: semicolon-separated, dd.mm.yyyy dates and decimal commas.
+
+    :param options: Passed on to generate_transactions.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Dato;Beskrivelse;Rentedato;Inn;Ut;Til konto;Fra konto\n")
+        for t in generate_transactions(rows, seed, **options):
+            amount_in = format_amount(t["Beløp"]) if t["Retning"] == "Inntekt" else ""
+            amount_out = format_amount(t["Beløp"]) if t["Retning"] == "Utgift" else ""
+            f.write(f"{t['Dato']};{t['Beskrivelse']};{t['Dato']};{amount_in};{amount_out};;\n")
+
+def write_eika_xlsx(path, rows, seed=0, **options):
+    """
+    Write an Eika-style XLSX export with the columns upload_file reads.
+
+    :param options: Passed on to generate_transactions.
+    """
+    if rows > XLSX_MAX_ROWS:
+        raise ValueError(f"An XLSX sheet holds at most {XLSX_MAX_ROWS} rows; use the CSV format or the database for more")
+    from openpyxl import Workbook  # Comes with pandas' Excel support; imported here since it is slow to load
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transaksjoner")
+    sheet.append(["Utført dato", "Bokført dato", "Beskrivelse", "Melding/KID/Fakt.nr", "Beløp inn", "Beløp ut"])
+    for t in generate_transactions(rows, seed, **options):
+        day = date(int(t["Dato"][6:]), int(t["Dato"][3:5]), int(t["Dato"][:2]))
+        # Bills carry a KID number in the message column, which upload_file appends to the description
+        message = str(int(hashlib.md5(t["Dato"].encode()).hexdigest()[:10], 16)) if "STRØM" in t["Beskrivelse"] else ""
+        amount_in = t["Beløp"] if t["Retning"] == "Inntekt" else None
+        amount_out = t["Beløp"] if t["Retning"] == "Utgift" else None
+        sheet.append([day, day, t["Beskrivelse"], message, amount_in, amount_out])
+    workbook.save(path)
+
+def seed_database(db, rows, seed=0, accounts=1, batch_size=50000, **options):
+    """
+    Insert synthetic transactions straight into the database, bypassing the per-row duplicate check in
+    insert_transactions. Generated duplicates are left out, so the result looks like an imported history.
+
+    :param db: A Database.
+    :param accounts: Number of accounts to spread the rows over; missing accounts are created.
+    :return: The number of rows inserted.
+    """
+    existing = db.fetch_all_accounts()
+    for number in range(len(existing), accounts):
+        db.insert_account(f"Konto {number + 1}", f"1234.56.{number + 1:05d}", "Syntetiske data")
+    account_ids = [account[0] for account in db.fetch_all_accounts()][:accounts]
+
+    options.setdefault("duplicate_rate", 0)
+    inserted = 0
+    for index, account_id in enumerate(account_ids):
+        account_rows = rows // accounts + (1 if index < rows % accounts else 0)
+        batch = []
+        for t in generate_transactions(account_rows, seed + index, **options):
+            # Same hash as insert_transactions, so later imports of the same rows are recognized
+            description_hash = hashlib.md5((str(t["Dato"]) + t["Beskrivelse"] + str(t["Beløp"])).encode()).hexdigest()
+            batch.append((account_id, t["Dato"], t["Beskrivelse"], t["Beløp"], t["Retning"], t["Kategori"], description_hash))
+            if len(batch) >= batch_size:
+                inserted += insert_batch(db, batch)
+                batch = []
+        inserted += insert_batch(db, batch)
+    return inserted
+
+def insert_batch(db, batch):
+    with db.conn:
+        db.conn.executemany("INSERT INTO transactions (account_id, Dato, Beskrivelse, Beløp, Retning, Kategori, hash) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+    return len(batch)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic bank transactions.")
+    parser.add_argument("format", choices=["eika", "sparebank1", "db"], help="eika (XLSX), sparebank1 (CSV) or db (seed a database)")
+    parser.add_argument("path", help="Output file or database")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of transactions, e.g. 1000 to 10000000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--accounts", type=int, default=1, help="Accounts to spread the rows over (db only)")
+    parser.add_argument("--categorized", action="store_true", help="Fill in the categories (db only)")
+    args = parser.parse_args()
+
+    if args.format == "eika":
+        write_eika_xlsx(args.path, args.rows, args.seed)
+    elif args.format == "sparebank1":
+        write_sparebank1_csv(args.path, args.rows, args.seed)
+    else:
+        from database import Database
+        seed_database(Database(args.path), args.rows, args.seed, args.accounts, with_categories=args.categorized)
+    print(f"Wrote {args.rows} transactions to {args.path}")
+
+if __name__ == "__main__":
+    main()
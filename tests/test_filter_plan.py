@@ -0,0 +1,67 @@
+"""
+Check with EXPLAIN QUERY PLAN that the transaction filters keep using their indexes.
+Run with `python -m pytest` from the project folder.
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import Database
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "transactions.db"))
+    account_id = db.account_registry.ids()[0]
+    db.insert_transactions(account_id, [
+        {"Dato": f"{day % 28 + 1:02d}.{day % 12 + 1:02d}.2024", "Beskrivelse": f"Butikk {day}", "Beløp": -day - 1.5,
+         "Retning": "Utgift" if day % 3 else "Inntekt", "Kategori": "Mat" if day % 2 else ""}
+        for day in range(500)
+    ])
+    db.conn.execute("ANALYZE")
+    yield db
+    db.conn.close()
+
+def plan(db, **filters):
+    return " | ".join(db.explain_filter_query(account_id=db.account_registry.ids()[0], **filters))
+
+@pytest.mark.parametrize("from_date, to_date", [
+    (date(2024, 1, 1), date(2024, 3, 31)),
+    ("01.01.2024", "31.12.2024"),
+])
+def test_date_range_uses_date_index(db, from_date, to_date):
+    steps = plan(db, from_date=from_date, to_date=to_date)
+    assert "USING INDEX idx_transactions_date (account_id=? AND <expr>>? AND <expr><?)" in steps
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"descending": True},
+    {"search": "butikk 1"},
+    {"direction": "Utgift", "descending": True},
+    {"from_date": date(2024, 2, 1), "to_date": date(2024, 5, 31)},
+])
+def test_date_sort_uses_date_index(db, filters):
+    steps = plan(db, order_by="Dato", **filters)
+    assert "USING INDEX idx_transactions_date" in steps
+    assert "TEMP B-TREE" not in steps
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"descending": True},
+    {"direction": "Inntekt"},
+])
+def test_amount_sort_uses_amount_index(db, filters):
+    steps = plan(db, order_by="Beløp", **filters)
+    assert "USING INDEX idx_transactions_amount" in steps
+    assert "TEMP B-TREE" not in steps
+
+@pytest.mark.parametrize("order_by", ["Dato", "Beløp"])
+def test_sorted_page_reads_only_the_page(db, order_by):
+    # Without a temp B-tree, LIMIT stops the index walk after the page instead of sorting every row
+    steps = plan(db, order_by=order_by, descending=True, limit=25, offset=50)
+    assert "TEMP B-TREE" not in steps
+    page = db.filter_transactions(account_id=db.account_registry.ids()[0], order_by=order_by, descending=True, limit=25, offset=50)
+    everything = db.filter_transactions(account_id=db.account_registry.ids()[0], order_by=order_by, descending=True)
+    assert page == everything[50:75]
@@ -0,0 +1,232 @@
+from tkinter import ttk
+from collections import OrderedDict
+
+class VirtualTreeview:
+    """
+    A Treeview that only materializes the rows in view.
+
+    Rows come from a data source set with `set_source(row_count, fetch_rows)`, where
+    fetch_rows(offset, limit) returns row tuples whose first value is the transaction ID.
+    Rows are fetched in blocks as the user scrolls, and only the most recently used
+    blocks are kept. Selection is tracked as a set of IDs, so it survives scrolling and
+    covers rows that are not on screen.
+    """
+    BLOCK_SIZE = 200  # Rows fetched per call to fetch_rows
+    MAX_CACHED_BLOCKS = 8
+    BUFFER_ROWS = 2  # Extra rows rendered below the window, so partial rows are never blank
+
+    def __init__(self, parent, columns, format_row=None):
+        self.columns = columns
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", selectmode="extended")
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.format_row = format_row or (lambda row: row)
+        self.row_count = 0
+        self.fetch_rows = None
+        self.fetch_ids = None
+        self.top = 0  # Index of the first row in view
+        self.visible_rows = 20
+        self.blocks = OrderedDict()  # Block index -> rows, least recently used first
+        self.selected = set()  # Selected transaction IDs
+        self.all_selected = False
+        self.rendered_selection = set()
+        self.rendered_values = {}  # iid -> values currently shown in the Treeview
+        self.extend_selection = False
+
+        self.tree.bind("<Configure>", self.on_configure)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<ButtonPress-1>", self.on_click)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Up>", lambda event: self.on_arrow_key(event, -1))
+        self.tree.bind("<Down>", lambda event: self.on_arrow_key(event, 1))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.visible_rows))
+
+    def set_source(self, row_count, fetch_rows, fetch_ids=None):
+        """
+        Show a new set of rows, scrolled to the top and with nothing selected.
+
+        :param row_count: Total number of rows in the source.
+        :param fetch_rows: Callable (offset, limit) -> list of row tuples.
+        :param fetch_ids: Optional callable returning all IDs in the source, used when every row is selected.
+        """
+        self.row_count = row_count
+        self.fetch_rows = fetch_rows
+        self.fetch_ids = fetch_ids
+        self.top = 0
+        self.blocks.clear()
+        self.selected.clear()
+        self.all_selected = False
+        self.render()
+
+    def refresh(self, row_count, fetch_rows=None, fetch_ids=None):
+        """
+        Reload the rows from the source while keeping the scroll position and selection.
+        Only rows that actually changed are touched in the Treeview.
+        """
+        if row_count != self.row_count:
+            self.all_selected = False  # "Select all" meant the rows there were, not ones added later
+        self.row_count = row_count
+        self.fetch_rows = fetch_rows or self.fetch_rows
+        self.fetch_ids = fetch_ids or self.fetch_ids
+        self.top = max(0, min(self.top, self.row_count - self.visible_rows))
+        self.blocks.clear()
+        self.render()
+
+    def deselect(self, transaction_ids):
+        if self.all_selected:
+            # The rest of the rows can't be listed once the source has changed, so clear the selection
+            self.all_selected = False
+            self.selected.clear()
+        self.selected.difference_update(transaction_ids)
+
+    def get_row_at(self, index):
+        block_index = index // self.BLOCK_SIZE
+        block = self.blocks.get(block_index)
+        if block is None:
+            block = self.fetch_rows(block_index * self.BLOCK_SIZE, self.BLOCK_SIZE)
+            self.blocks[block_index] = block
+            if len(self.blocks) > self.MAX_CACHED_BLOCKS:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(block_index)
+        offset = index - block_index * self.BLOCK_SIZE
+        return block[offset] if offset < len(block) else None
+
+    def get_row(self, transaction_id):
+        """Return the cached row for a transaction ID, or None if it isn't loaded."""
+        for block in self.blocks.values():
+            for row in block:
+                if row[0] == transaction_id:
+                    return row
+        return None
+
+    def update_row(self, row):
+        """Replace a cached row (matched on ID) and redraw it if it is in view."""
+        for block in self.blocks.values():
+            for index, cached_row in enumerate(block):
+                if cached_row[0] == row[0]:
+                    block[index] = row
+        if str(row[0]) in self.rendered_values:
+            self.render_row(str(row[0]), self.format_row(row))
+
+    def render_row(self, iid, values):
+        # Update only the cells whose value changed
+        old_values = self.rendered_values[iid]
+        for column, old_value, value in zip(self.columns, old_values, values):
+            if old_value != value:
+                self.tree.set(iid, column, value)
+        self.rendered_values[iid] = values
+
+    def render(self):
+        # Reconcile the Treeview with the rows in view, keyed on transaction ID:
+        # remove rows that left the window, insert new ones and patch changed cells
+        rows = []
+        end = min(self.top + self.visible_rows + self.BUFFER_ROWS, self.row_count)
+        for index in range(self.top, end):
+            row = self.get_row_at(index)
+            if row is None:
+                break
+            rows.append(row)
+
+        wanted = {str(row[0]) for row in rows}
+        stale = [iid for iid in self.tree.get_children() if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self.rendered_values[iid]
+
+        for position, row in enumerate(rows):
+            iid = str(row[0])
+            values = self.format_row(row)
+            if iid in self.rendered_values:
+                self.render_row(iid, values)
+                if self.tree.index(iid) != position:
+                    self.tree.move(iid, "", position)
+            else:
+                self.tree.insert("", position, values=values, iid=iid)
+                self.rendered_values[iid] = values
+
+        # Re-apply the ID-based selection to the rows now in view
+        self.rendered_selection = {iid for iid in self.tree.get_children() if self.all_selected or int(iid) in self.selected}
+        self.tree.selection_set(list(self.rendered_selection))
+
+        if self.row_count:
+            self.scrollbar.set(self.top / self.row_count, min(self.top + self.visible_rows, self.row_count) / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, rows):
+        top = max(0, min(self.top + rows, self.row_count - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+        return "break"
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll(int(float(args[0]) * self.row_count) - self.top)
+        elif action == "scroll":
+            amount = int(args[0])
+            self.scroll(amount * self.visible_rows if args[1] == "pages" else amount)
+
+    def on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_arrow_key(self, event, direction):
+        self.extend_selection = bool(event.state & 0x0001)
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if not children or focus not in children:
+            return None
+        position = children.index(focus)
+        # Let the Treeview move the focus inside the window; scroll when it would leave it
+        if (direction < 0 and position == 0) or (direction > 0 and position >= min(self.visible_rows, len(children)) - 1):
+            self.scroll(direction)
+            children = self.tree.get_children()
+            target = children[min(max(position, 0), len(children) - 1)]
+            self.tree.focus(target)
+            self.tree.selection_set(target)
+            return "break"
+        return None
+
+    def on_configure(self, event):
+        rowheight = int(str(ttk.Style().lookup("Treeview", "rowheight") or 20))
+        visible_rows = max(1, (event.height - rowheight) // rowheight)  # Minus one row for the headings
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.top = max(0, min(self.top, self.row_count - self.visible_rows))
+            self.render()
+
+    def on_click(self, event):
+        # Shift/Ctrl-clicks add to the selection; plain clicks replace it, also off screen
+        self.extend_selection = bool(event.state & 0x0005)
+
+    def on_select(self, event):
+        current = set(self.tree.selection())
+        if current == self.rendered_selection:
+            return  # Our own selection_set from render()
+        if self.all_selected or not self.extend_selection:
+            self.all_selected = False
+            self.selected = {int(iid) for iid in current}
+        else:
+            in_view = {int(iid) for iid in self.tree.get_children()}
+            self.selected = (self.selected - in_view) | {int(iid) for iid in current}
+        self.rendered_selection = current
+
+    def select_all(self):
+        self.all_selected = True
+        self.render()
+
+    def selected_ids(self):
+        """Return the selected transaction IDs, including rows that are scrolled out of view."""
+        if self.all_selected:
+            if self.fetch_ids:
+                return list(self.fetch_ids())
+            return [row[0] for row in self.fetch_rows(0, self.row_count)]
+        return sorted(self.selected)